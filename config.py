@@ -1,10 +1,15 @@
 # config.py - Configuration management
 
+import functools
 import os
 from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
+
+@functools.lru_cache(maxsize=1)
+def _load_env():
+    """Load environment variables from the .env file once per process"""
+    load_dotenv()
+    return True
 
 
 class Config:
@@ -13,6 +18,8 @@ class Config:
     """
 
     def __init__(self):
+        _load_env()
+
         # Required API Keys
         self.TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
         self.OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -28,15 +35,44 @@ class Config:
         self.DB_PASSWORD = os.getenv("DB_PASSWORD", "postgres")
         self.DB_HOST = os.getenv("DB_HOST", "localhost")
         self.DB_PORT = os.getenv("DB_PORT", "5432")
+        self.DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+        self.DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+        self.DB_READ_CACHE_TTL = int(os.getenv("DB_READ_CACHE_TTL", "30"))  # seconds
+
+        # Shared page/analysis/embedding cache (disabled when REDIS_URL is unset)
+        self.REDIS_URL = os.getenv("REDIS_URL")
+        self.LINK_CACHE_TTL = int(os.getenv("LINK_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+        # Page HTML is only read back by /archive, so it is cached separately and briefly
+        self.LINK_HTML_CACHE_TTL = int(os.getenv("LINK_HTML_CACHE_TTL", str(3600)))  # seconds
+        # Server-side prepared statements (PostgreSQL 12+); keep off behind PgBouncer transaction pooling
+        self.USE_PREPARED_STATEMENTS = os.getenv("USE_PREPARED_STATEMENTS", "false").lower() in {"true", "1", "yes"}
 
         # Bot Configuration
         self.MAX_MESSAGE_LENGTH = 4000
         self.MAX_CONVERSATION_HISTORY = 20
         self.DEFAULT_MODEL = os.getenv("DEFAULT_MODEL", "gpt-4o-mini")
         self.EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+        self.FALLBACK_MODEL = os.getenv("FALLBACK_MODEL", "gpt-4o-mini")
+        self.ANALYSIS_MAX_TOKENS = int(os.getenv("ANALYSIS_MAX_TOKENS", "800"))
+        self.ANALYSIS_INPUT_TOKENS = int(os.getenv("ANALYSIS_INPUT_TOKENS", "1500"))
+        self.EMBEDDING_INPUT_TOKENS = int(os.getenv("EMBEDDING_INPUT_TOKENS", "1000"))
+        # OpenAI HTTP pool: concurrent connections and per-read timeout (seconds)
+        self.OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "128"))
+        self.OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+        # Pages with fewer readable words than this skip AI analysis and embeddings
+        self.MIN_ANALYSIS_WORDS = int(os.getenv("MIN_ANALYSIS_WORDS", "40"))
+        # Chats whose link messages may run through the ingest pipeline at the same time
+        self.MAX_ACTIVE_CHATS = int(os.getenv("MAX_ACTIVE_CHATS", "8"))
+        self.EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "1536"))
+        # Store embeddings as pgvector vector(EMBEDDING_DIMENSIONS) instead of JSONB (needs the extension)
+        self.ENABLE_PGVECTOR = os.getenv("ENABLE_PGVECTOR", "false").lower() in {"true", "1", "yes"}
 
         # File Processing Settings
         self.MAX_FILE_SIZE_MB = 50
+        # Fetched HTML beyond this many (decompressed) bytes is ignored
+        self.MAX_HTML_BYTES = int(os.getenv("MAX_HTML_BYTES", str(1024 * 1024)))
+        # In-process page cache budget, in characters of HTML + text across all entries
+        self.PAGE_CACHE_MAX_CHARS = int(os.getenv("PAGE_CACHE_MAX_CHARS", str(64 * 1024 * 1024)))
         self.TEMP_DIR = "temp_files"
         self.KNOWLEDGE_BASE_DIR = "knowledge_base"
         self.SCREENSHOT_DIR = os.getenv("SCREENSHOT_DIR", os.path.join(self.TEMP_DIR, "screenshots"))
@@ -96,3 +132,9 @@ Config Status:
 - Default Model: {self.DEFAULT_MODEL}
 - Embedding Model: {self.EMBEDDING_MODEL}
         """
+
+
+@functools.lru_cache(maxsize=1)
+def get_config():
+    """Return the process-wide Config instance, building it on first use"""
+    return Config()
@@ -5,19 +5,30 @@ This module encapsulates all direct interactions with PostgreSQL, including
 schema management and the CRUD helpers used throughout the bot.
 """
 
+import atexit
+import hashlib
+import itertools
+import json
 import logging
+import re
+import threading
 from contextlib import contextmanager
 from datetime import datetime
-from typing import Any, Dict, Iterable, List, Optional
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from cachetools import LRUCache, TTLCache
 
 import psycopg2
-from psycopg2.extras import RealDictCursor, Json
+from psycopg2.extensions import connection as PGConnection
+from psycopg2.pool import ThreadedConnectionPool
+from psycopg2.extras import RealDictCursor
 
-from config import Config
+from config import get_config
 
 logger = logging.getLogger(__name__)
 
-config = Config()
+config = get_config()
 
 # Support both individual DB variables and DATABASE_URL environment variable
 import os
@@ -26,43 +37,234 @@ DATABASE_URL = os.getenv("DATABASE_URL") or (
     f"@{config.DB_HOST}:{config.DB_PORT}/{config.DB_NAME}"
 )
 
-_METADATA_SCHEMA_ENSURED = False
+# Cursor factories are resolved once here rather than on every _cursor() call.
+_DICT_CURSOR_FACTORY = RealDictCursor
+_TUPLE_CURSOR_FACTORY = None
+
+_POOL: Optional[ThreadedConnectionPool] = None
+_POOL_LOCK = threading.Lock()
+# ThreadedConnectionPool.getconn() raises PoolError instead of waiting when every
+# connection is checked out, so callers queue here for a free slot first.
+_POOL_SLOTS = threading.BoundedSemaphore(config.DB_POOL_SIZE)
+
+# Short-lived caches for idempotent reads that are re-hit within a conversation.
+# Values are frozen so callers cannot mutate what other callers will receive.
+_READ_CACHE_LOCK = threading.Lock()
+_RECENT_LINKS_CACHE: TTLCache = TTLCache(maxsize=2048, ttl=config.DB_READ_CACHE_TTL)
+_LINK_STATS_CACHE: TTLCache = TTLCache(maxsize=2048, ttl=config.DB_READ_CACHE_TTL)
+_SEARCH_CACHE: TTLCache = TTLCache(maxsize=4096, ttl=config.DB_READ_CACHE_TTL)
+_LINK_OWNERS: LRUCache = LRUCache(maxsize=8192)
+# Bumped by _invalidate so a load that raced a write is not cached afterwards.
+# _CACHE_GENERATIONS is keyed by user id; _CACHE_EPOCH covers the drop-everything path.
+# A generation only matters to loads still running, so it outlives the cached reads
+# it guards by a wide margin and is then dropped instead of kept for every user forever.
+_CACHE_GENERATION = itertools.count(1)
+_CACHE_GENERATIONS: TTLCache = TTLCache(maxsize=65536, ttl=max(60, config.DB_READ_CACHE_TTL * 10))
+_CACHE_EPOCH = 0
+
+# link_id -> {annotation: fingerprint} of what save_link_bundle last wrote, so re-saving
+# an unchanged page (a re-share, a re-scrape) skips its metadata/annotation/embedding writes.
+_LAST_WRITTEN_LOCK = threading.Lock()
+_LAST_WRITTEN: LRUCache = LRUCache(maxsize=1024)
+
+
+class _PreparingConnection(PGConnection):
+    """Connection that remembers which statements were PREPAREd in its session."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+
+def _get_pool() -> ThreadedConnectionPool:
+    """Lazily builds the shared connection pool on first use."""
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                connect_kwargs: Dict[str, Any] = {}
+                if config.USE_PREPARED_STATEMENTS:
+                    connect_kwargs["connection_factory"] = _PreparingConnection
+                    # Avoid generic plans that ignore skew between users.
+                    connect_kwargs["options"] = "-c plan_cache_mode=force_custom_plan"
+                _POOL = ThreadedConnectionPool(
+                    minconn=config.DB_POOL_MIN,
+                    maxconn=config.DB_POOL_SIZE,
+                    dsn=DATABASE_URL,
+                    **connect_kwargs,
+                )
+                atexit.register(_POOL.closeall)
+    return _POOL
 
 
 @contextmanager
 def _connection():
-    """Context manager that yields a PostgreSQL connection."""
-    conn = psycopg2.connect(DATABASE_URL)
-    try:
-        yield conn
-    finally:
-        conn.close()
+    """
+    Context manager that checks a PostgreSQL connection out of the pool, waiting for
+    one to be returned when all DB_POOL_SIZE connections are in use.
+    """
+    pool = _get_pool()
+    with _POOL_SLOTS:
+        conn = pool.getconn()
+        try:
+            yield conn
+        finally:
+            # Broken connections are discarded instead of being handed out again.
+            pool.putconn(conn, close=bool(conn.closed))
 
 
 @contextmanager
-def _cursor(*, commit: bool = False, dict_cursor: bool = False):
+def _cursor(*, commit: bool = False, dict_cursor: bool = False, conn=None):
     """
     Context manager that yields a cursor and automatically handles commits/rollbacks.
+
+    Pass ``conn`` to reuse a connection that is already checked out of the pool.
     """
-    cursor_factory = RealDictCursor if dict_cursor else None
-    with _connection() as conn:
-        cur = conn.cursor(cursor_factory=cursor_factory)
+    if conn is None:
+        with _connection() as pooled_conn:
+            with _cursor(commit=commit, dict_cursor=dict_cursor, conn=pooled_conn) as cur:
+                yield cur
+        return
+
+    cur = conn.cursor(cursor_factory=_DICT_CURSOR_FACTORY if dict_cursor else _TUPLE_CURSOR_FACTORY)
+    try:
+        yield cur
+        if commit:
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        logger.exception("Database error")
+        raise
+    finally:
+        cur.close()
+
+
+class _StatementBatch:
+    """
+    Cursor stand-in that collects write statements and sends them in one round trip.
+
+    psycopg2 has no libpq pipeline mode, so statements whose results are not needed
+    are mogrified client-side and flushed as a single multi-statement execute.
+    """
+
+    def __init__(self, cur):
+        self._cur = cur
+        self.connection = cur.connection
+        self._statements: List[bytes] = []
+
+    def mogrify(self, query, params=None) -> bytes:
+        return self._cur.mogrify(query, params)
+
+    def execute(self, query, params=None) -> None:
+        self._statements.append(self._cur.mogrify(query, params).strip().rstrip(b";"))
+
+    def flush(self) -> None:
+        if self._statements:
+            self._cur.execute(b";\n".join(self._statements) + b";")
+            self._statements.clear()
+
+
+def _execute(cur, name: str, query: str, params: Sequence[Any]) -> None:
+    """
+    Runs a hot-path statement, using a named server-side prepared statement when enabled.
+
+    The query is written with ``%s`` placeholders exactly as for ``cur.execute``; it is
+    PREPAREd once per pooled connection and subsequent calls only send ``EXECUTE``.
+    """
+    # Batched statements are already a single round trip; PREPARE would only add one.
+    prepared = None if isinstance(cur, _StatementBatch) else getattr(cur.connection, "prepared", None)
+    if prepared is None:
+        cur.execute(query, params)
+        return
+
+    if name not in prepared:
+        positional = iter(range(1, len(params) + 1))
+        body = re.sub(r"%s", lambda _: f"${next(positional)}", query.strip().rstrip(";"))
+        cur.execute(f"PREPARE {name} AS {body};")
+        prepared.add(name)
+
+    if not params:
+        cur.execute(f"EXECUTE {name};")
+        return
+    placeholders = ", ".join(["%s"] * len(params))
+    cur.execute(f"EXECUTE {name} ({placeholders});", params)
+
+
+def _freeze(value: Any) -> Any:
+    """Makes a fetched row (or list of rows) read-only for caching."""
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return MappingProxyType(value)
+    return value
+
+
+def _cached(cache: TTLCache, key: Hashable, loader: Callable[[], Any], user_id: int) -> Any:
+    """
+    Returns ``cache[key]``, filling it from ``loader`` on a miss.
+
+    ``loader`` runs outside the lock; its result is only stored if ``user_id`` was not
+    invalidated while it ran, so a read that raced a write cannot outlive it.
+    """
+    with _READ_CACHE_LOCK:
         try:
-            yield cur
-            if commit:
-                conn.commit()
-        except Exception:
-            conn.rollback()
-            logger.exception("Database error")
-            raise
-        finally:
-            cur.close()
+            return cache[key]
+        except KeyError:
+            pass
+        generation = (_CACHE_EPOCH, _CACHE_GENERATIONS.get(user_id))
+    value = _freeze(loader())
+    with _READ_CACHE_LOCK:
+        if generation == (_CACHE_EPOCH, _CACHE_GENERATIONS.get(user_id)):
+            cache[key] = value
+    return value
+
+
+def _remember_owner(link_id: Optional[int], user_id: Optional[int]) -> None:
+    if link_id is not None and user_id is not None:
+        with _READ_CACHE_LOCK:
+            _LINK_OWNERS[link_id] = user_id
+
+
+def _invalidate(*, user_id: Optional[int] = None, link_id: Optional[int] = None) -> None:
+    """Evicts cached reads affected by a write to a user's links."""
+    global _CACHE_EPOCH
+    with _READ_CACHE_LOCK:
+        if user_id is None and link_id is not None:
+            user_id = _LINK_OWNERS.get(link_id)
+            if user_id is None:
+                # Unknown owner: drop every per-user entry rather than serve stale data.
+                _CACHE_EPOCH += 1
+                _RECENT_LINKS_CACHE.clear()
+                _LINK_STATS_CACHE.clear()
+                _SEARCH_CACHE.clear()
+                return
+        if user_id is not None:
+            _CACHE_GENERATIONS[user_id] = next(_CACHE_GENERATION)
+            for cache in (_RECENT_LINKS_CACHE, _SEARCH_CACHE):
+                for key in [key for key in cache if key[0] == user_id]:
+                    cache.pop(key, None)
+            _LINK_STATS_CACHE.pop(user_id, None)
 
 
 def _drop_legacy_tables(cur) -> None:
     """
     Removes old ShopSmart tables when present so the new schema can be created.
+
+    The pg_tables probe only needs to run until it has succeeded once; a sentinel row
+    in schema_migrations short-circuits it on later startups.
     """
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name       VARCHAR(100) PRIMARY KEY,
+            applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        );
+        """
+    )
+    cur.execute("SELECT 1 FROM schema_migrations WHERE name = 'legacy_dropped_v1';")
+    if cur.fetchone():
+        return
+
     legacy_tables = {
         "stores",
         "shopping_lists",
@@ -93,6 +295,9 @@ def _drop_legacy_tables(cur) -> None:
             CASCADE;
             """
         )
+    cur.execute(
+        "INSERT INTO schema_migrations (name) VALUES ('legacy_dropped_v1') ON CONFLICT (name) DO NOTHING;"
+    )
 
 
 def create_tables(reset: bool = False) -> None:
@@ -107,6 +312,8 @@ def create_tables(reset: bool = False) -> None:
         try:
             if reset:
                 logger.warning("Resetting database schema for link manager.")
+                with _LAST_WRITTEN_LOCK:
+                    _LAST_WRITTEN.clear()  # link_ids restart with the new tables.
                 cur.execute(
                     """
                     DROP TABLE IF EXISTS
@@ -156,7 +363,6 @@ def create_tables(reset: bool = False) -> None:
                     description     TEXT,
                     domain          VARCHAR(255),
                     screenshot_path VARCHAR(255),
-                    archived_html   TEXT,
                     ai_summary      TEXT,
                     created_at      TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
                     updated_at      TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
@@ -171,10 +377,20 @@ def create_tables(reset: bool = False) -> None:
                 "ALTER TABLE links ADD COLUMN IF NOT EXISTS screenshot_path VARCHAR(255);"
             )
             cur.execute(
-                "ALTER TABLE links ADD COLUMN IF NOT EXISTS archived_html TEXT;"
+                "ALTER TABLE links ADD COLUMN IF NOT EXISTS ai_summary TEXT;"
             )
+            # Precomputed, weighted search document (title > description > summary) so
+            # full-text search can filter with @@ on a GIN index instead of building a
+            # tsvector for every row of the user's links at query time.
             cur.execute(
-                "ALTER TABLE links ADD COLUMN IF NOT EXISTS ai_summary TEXT;"
+                """
+                ALTER TABLE links ADD COLUMN IF NOT EXISTS search_doc tsvector
+                GENERATED ALWAYS AS (
+                    setweight(to_tsvector('english', coalesce(title, '')), 'A')
+                    || setweight(to_tsvector('english', coalesce(description, '')), 'B')
+                    || setweight(to_tsvector('english', coalesce(ai_summary, '')), 'C')
+                ) STORED;
+                """
             )
 
             cur.execute(
@@ -203,6 +419,38 @@ def create_tables(reset: bool = False) -> None:
                 "ALTER TABLE link_metadata ADD COLUMN IF NOT EXISTS word_count INT;"
             )
 
+            # Server-side upsert: PL/pgSQL caches the plan of the statement it wraps,
+            # so callers only send a short function call.
+            cur.execute(
+                """
+                CREATE OR REPLACE FUNCTION upsert_link_metadata(
+                    p_link_id       INT,
+                    p_favicon       TEXT,
+                    p_author        VARCHAR,
+                    p_publish_date  TIMESTAMP WITH TIME ZONE,
+                    p_read_time     INT,
+                    p_content_type  VARCHAR,
+                    p_canonical_url TEXT,
+                    p_language      VARCHAR,
+                    p_word_count    INT
+                ) RETURNS void LANGUAGE plpgsql AS $$
+                BEGIN
+                    INSERT INTO link_metadata (link_id, favicon, author, publish_date, read_time, content_type, canonical_url, language, word_count)
+                    VALUES (p_link_id, p_favicon, p_author, p_publish_date, p_read_time, p_content_type, p_canonical_url, p_language, p_word_count)
+                    ON CONFLICT (link_id) DO UPDATE SET
+                        favicon      = COALESCE(EXCLUDED.favicon, link_metadata.favicon),
+                        author       = COALESCE(EXCLUDED.author, link_metadata.author),
+                        publish_date = COALESCE(EXCLUDED.publish_date, link_metadata.publish_date),
+                        read_time    = COALESCE(EXCLUDED.read_time, link_metadata.read_time),
+                        content_type = COALESCE(EXCLUDED.content_type, link_metadata.content_type),
+                        canonical_url = COALESCE(EXCLUDED.canonical_url, link_metadata.canonical_url),
+                        language     = COALESCE(EXCLUDED.language, link_metadata.language),
+                        word_count   = COALESCE(EXCLUDED.word_count, link_metadata.word_count);
+                END;
+                $$;
+                """
+            )
+
             cur.execute(
                 """
                 CREATE TABLE IF NOT EXISTS link_categories (
@@ -271,6 +519,9 @@ def create_tables(reset: bool = False) -> None:
                 """
             )
 
+            if config.ENABLE_PGVECTOR:
+                _migrate_embeddings_to_pgvector(cur)
+
             cur.execute(
                 """
                 CREATE TABLE IF NOT EXISTS link_snapshots (
@@ -286,28 +537,104 @@ def create_tables(reset: bool = False) -> None:
             cur.execute(
                 "CREATE INDEX IF NOT EXISTS idx_links_user_created_at ON links (user_id, created_at DESC);"
             )
+            # Partial index for the /stats top-domains aggregate (index-only scan).
+            cur.execute(
+                "CREATE INDEX IF NOT EXISTS idx_links_user_domain ON links (user_id, domain) WHERE domain IS NOT NULL;"
+            )
             cur.execute(
                 "CREATE INDEX IF NOT EXISTS idx_link_categories_category ON link_categories (category);"
             )
+            # Covering index so per-link category aggregation never touches the heap.
+            cur.execute(
+                "CREATE INDEX IF NOT EXISTS idx_link_categories_link ON link_categories (link_id) INCLUDE (category);"
+            )
             cur.execute(
                 "CREATE INDEX IF NOT EXISTS idx_link_entities_name ON link_entities (entity_name);"
             )
+            # idx_links_search indexed an expression no query matched; search_doc replaces it.
+            cur.execute("DROP INDEX IF EXISTS idx_links_search;")
             cur.execute(
-                """
-                CREATE INDEX IF NOT EXISTS idx_links_search
-                ON links USING GIN (to_tsvector('english', coalesce(title, '') || ' ' || coalesce(description, '')));
-                """
+                "CREATE INDEX IF NOT EXISTS idx_links_search_doc ON links USING GIN (search_doc);"
             )
 
+            # Trigram indexes let the ILIKE '%query%' search fallback use the index
+            # instead of scanning every link. pg_trgm may be unavailable (e.g. no
+            # superuser on managed hosts), in which case search still works unindexed.
+            cur.execute("SAVEPOINT pg_trgm_setup;")
+            try:
+                cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+            except psycopg2.Error:
+                cur.execute("ROLLBACK TO SAVEPOINT pg_trgm_setup;")
+                logger.warning("pg_trgm extension unavailable; search fallback will not be indexed.")
+            else:
+                cur.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_links_title_trgm ON links USING GIN (title gin_trgm_ops);"
+                )
+                cur.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_links_description_trgm ON links USING GIN (description gin_trgm_ops);"
+                )
+                cur.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_link_categories_category_trgm ON link_categories USING GIN (category gin_trgm_ops);"
+                )
+                cur.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_link_entities_name_trgm ON link_entities USING GIN (entity_name gin_trgm_ops);"
+                )
+                cur.execute("RELEASE SAVEPOINT pg_trgm_setup;")
+
+            # Refresh planner statistics so the new indexes are considered straight away.
+            cur.execute("ANALYZE links, link_categories;")
+
             conn.commit()
         finally:
             cur.close()
 
 
+def _migrate_embeddings_to_pgvector(cur) -> None:
+    """Converts link_embeddings.embedding from JSONB to a pgvector column and indexes it."""
+    cur.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+    cur.execute(
+        """
+        SELECT data_type FROM information_schema.columns
+        WHERE table_name = 'link_embeddings' AND column_name = 'embedding';
+        """
+    )
+    row = cur.fetchone()
+    if row and row[0] == "jsonb":
+        logger.info("Migrating link_embeddings.embedding from JSONB to vector(%s).", config.EMBEDDING_DIMENSIONS)
+        # A JSON array's text form is also valid pgvector input.
+        cur.execute(
+            f"""
+            ALTER TABLE link_embeddings
+            ALTER COLUMN embedding TYPE vector({int(config.EMBEDDING_DIMENSIONS)})
+            USING embedding::text::vector;
+            """
+        )
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_link_embeddings_ivfflat
+        ON link_embeddings USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
+        """
+    )
+
+
+def _serialize_embedding(embedding: Iterable[float]) -> str:
+    """
+    Serialises an embedding as a compact JSON array, e.g. '[0.1,0.2]'.
+
+    That text is valid input for both the JSONB column and pgvector's vector type, and
+    json.dumps encodes the floats in C instead of a per-element Python loop.
+    """
+    if not isinstance(embedding, (list, tuple)):
+        embedding = list(embedding)
+    return json.dumps(embedding, separators=(",", ":"))
+
+
 def add_user(user_id: int, username: Optional[str]) -> None:
     """Registers a Telegram user if they do not already exist."""
     with _cursor(commit=True) as cur:
-        cur.execute(
+        _execute(
+            cur,
+            "add_user_v1",
             """
             INSERT INTO users (user_id, username)
             VALUES (%s, %s)
@@ -328,7 +655,9 @@ def add_link(
     """Adds or updates a link and returns its link_id."""
     with _cursor(commit=True) as cur:
         try:
-            cur.execute(
+            _execute(
+                cur,
+                "add_link_v1",
                 """
                 INSERT INTO links (user_id, url, title, description, domain)
                 VALUES (%s, %s, %s, %s, %s)
@@ -343,48 +672,14 @@ def add_link(
                 (user_id, url, title, description, domain),
             )
             result = cur.fetchone()
-            return result[0] if result else None
         except psycopg2.Error:
             logger.exception("Failed to add/update link for user %s", user_id)
             return None
 
-
-def update_link_details(
-    link_id: int,
-    *,
-    title: Optional[str] = None,
-    description: Optional[str] = None,
-    domain: Optional[str] = None,
-    screenshot_path: Optional[str] = None,
-    archived_html: Optional[str] = None,
-    ai_summary: Optional[str] = None,
-) -> None:
-    """Updates selected columns on the links row."""
-    assignments: List[str] = []
-    values: List[Any] = []
-
-    def _add(column: str, value: Optional[Any]) -> None:
-        if value is not None:
-            assignments.append(f"{column} = %s")
-            values.append(value)
-
-    _add("title", title)
-    _add("description", description)
-    _add("domain", domain)
-    _add("screenshot_path", screenshot_path)
-    _add("archived_html", archived_html)
-    _add("ai_summary", ai_summary)
-
-    if not assignments:
-        return
-
-    assignments.append("updated_at = CURRENT_TIMESTAMP")
-    values.append(link_id)
-
-    query = f"UPDATE links SET {', '.join(assignments)} WHERE link_id = %s;"
-
-    with _cursor(commit=True) as cur:
-        cur.execute(query, values)
+    link_id = result[0] if result else None
+    _remember_owner(link_id, user_id)
+    _invalidate(user_id=user_id, link_id=link_id)
+    return link_id
 
 
 def _parse_datetime(candidate: Any) -> Optional[datetime]:
@@ -402,11 +697,8 @@ def _parse_datetime(candidate: Any) -> Optional[datetime]:
         return None
 
 
-def add_link_metadata(link_id: int, metadata: Dict[str, Any]) -> None:
-    """Upserts metadata for a link."""
-    if not metadata:
-        return
-
+def _normalise_metadata(metadata: Dict[str, Any]) -> tuple:
+    """Coerces scraped metadata into the column order used by link_metadata upserts."""
     publish_date = _parse_datetime(metadata.get("publish_date"))
     read_time = metadata.get("read_time")
     try:
@@ -414,90 +706,91 @@ def add_link_metadata(link_id: int, metadata: Dict[str, Any]) -> None:
     except (TypeError, ValueError):
         read_time = None
 
-    with _cursor(commit=True) as cur:
-        _ensure_link_metadata_columns(cur)
-        cur.execute(
-            """
-            INSERT INTO link_metadata (link_id, favicon, author, publish_date, read_time, content_type, canonical_url, language, word_count)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (link_id) DO UPDATE SET
-                favicon      = COALESCE(EXCLUDED.favicon, link_metadata.favicon),
-                author       = COALESCE(EXCLUDED.author, link_metadata.author),
-                publish_date = COALESCE(EXCLUDED.publish_date, link_metadata.publish_date),
-                read_time    = COALESCE(EXCLUDED.read_time, link_metadata.read_time),
-                content_type = COALESCE(EXCLUDED.content_type, link_metadata.content_type),
-                canonical_url = COALESCE(EXCLUDED.canonical_url, link_metadata.canonical_url),
-                language     = COALESCE(EXCLUDED.language, link_metadata.language),
-                word_count   = COALESCE(EXCLUDED.word_count, link_metadata.word_count);
-            """,
-            (
-                link_id,
-                metadata.get("favicon"),
-                metadata.get("author"),
-                publish_date,
-                read_time,
-                metadata.get("content_type"),
-                metadata.get("canonical_url"),
-                metadata.get("language"),
-                metadata.get("word_count"),
-            ),
-        )
+    return (
+        metadata.get("favicon"),
+        metadata.get("author"),
+        publish_date,
+        read_time,
+        metadata.get("content_type"),
+        metadata.get("canonical_url"),
+        metadata.get("language"),
+        metadata.get("word_count"),
+    )
 
 
-def add_link_categories(link_id: int, categories: Iterable[str]) -> None:
-    """Adds distinct categories for a link."""
-    if not categories:
-        return
+def _upsert_link_metadata(cur, link_id: int, metadata: Dict[str, Any]) -> None:
+    _execute(
+        cur,
+        "add_link_metadata_v2",
+        "SELECT upsert_link_metadata(%s, %s, %s, %s, %s, %s, %s, %s, %s);",
+        (link_id, *_normalise_metadata(metadata)),
+    )
 
-    with _cursor(commit=True) as cur:
-        for category in {c.strip() for c in categories if c}:
-            cur.execute(
-                """
-                INSERT INTO link_categories (link_id, category)
-                VALUES (%s, %s)
-                ON CONFLICT (link_id, category) DO NOTHING;
-                """,
-                (link_id, category),
-            )
 
+def _insert_link_categories(cur, link_id: int, categories: Iterable[str]) -> None:
+    # Trimming, blank filtering and de-duplication all happen server-side.
+    cur.execute(
+        """
+        INSERT INTO link_categories (link_id, category)
+        SELECT DISTINCT %s, trim(c)
+        FROM unnest(%s::text[]) AS t(c)
+        WHERE length(trim(c)) > 0
+        ON CONFLICT (link_id, category) DO NOTHING;
+        """,
+        (link_id, [category for category in categories if category]),
+    )
 
-def add_link_entities(link_id: int, entities: Iterable[Dict[str, Any]]) -> None:
-    """Stores extracted entities for a link."""
-    if not entities:
-        return
 
-    with _cursor(commit=True) as cur:
-        for entity in entities:
-            entity_name = entity.get("name")
-            entity_type = entity.get("type")
-            if not entity_name:
-                continue
-            cur.execute(
-                """
-                INSERT INTO link_entities (link_id, entity_type, entity_name)
-                VALUES (%s, %s, %s)
-                ON CONFLICT (link_id, entity_type, entity_name) DO NOTHING;
-                """,
-                (link_id, entity_type, entity_name),
-            )
+def _insert_link_entities(cur, link_id: int, entities: Iterable[Dict[str, Any]]) -> None:
+    entities = list(entities)
+    cur.execute(
+        """
+        INSERT INTO link_entities (link_id, entity_type, entity_name)
+        SELECT DISTINCT %s, t.entity_type, t.entity_name
+        FROM unnest(%s::text[], %s::text[]) AS t(entity_type, entity_name)
+        WHERE t.entity_name IS NOT NULL AND t.entity_name <> ''
+        ON CONFLICT (link_id, entity_type, entity_name) DO NOTHING;
+        """,
+        (
+            link_id,
+            [entity.get("type") for entity in entities],
+            [entity.get("name") for entity in entities],
+        ),
+    )
 
 
-def record_link_source(
+def _insert_link_source(
+    cur,
     link_id: int,
-    *,
     shared_by_user_id: Optional[int],
-    platform: Optional[str] = None,
-    shared_at: Optional[datetime] = None,
+    platform: Optional[str],
+    shared_at: Optional[datetime],
 ) -> None:
-    """Tracks how the link was shared with the bot."""
-    with _cursor(commit=True) as cur:
-        cur.execute(
-            """
-            INSERT INTO link_sources (link_id, shared_by_user_id, platform, shared_at)
-            VALUES (%s, %s, %s, %s);
-            """,
-            (link_id, shared_by_user_id, platform, shared_at or datetime.utcnow()),
-        )
+    _execute(
+        cur,
+        "record_link_source_v1",
+        """
+        INSERT INTO link_sources (link_id, shared_by_user_id, platform, shared_at)
+        VALUES (%s, %s, %s, %s);
+        """,
+        (link_id, shared_by_user_id, platform, shared_at or datetime.utcnow()),
+    )
+
+
+def _upsert_link_embedding(cur, link_id: int, embedding: Iterable[float], model: Optional[str]) -> None:
+    _execute(
+        cur,
+        "store_link_embedding_v1",
+        """
+        INSERT INTO link_embeddings (link_id, embedding, model)
+        VALUES (%s, %s, %s)
+        ON CONFLICT (link_id) DO UPDATE SET
+            embedding = EXCLUDED.embedding,
+            model     = EXCLUDED.model,
+            created_at = CURRENT_TIMESTAMP;
+        """,
+        (link_id, _serialize_embedding(embedding), model),
+    )
 
 
 def add_link_snapshot(link_id: int, snapshot_url: str) -> None:
@@ -505,7 +798,9 @@ def add_link_snapshot(link_id: int, snapshot_url: str) -> None:
     if not snapshot_url:
         return
     with _cursor(commit=True) as cur:
-        cur.execute(
+        _execute(
+            cur,
+            "add_link_snapshot_v1",
             """
             INSERT INTO link_snapshots (link_id, snapshot_url)
             VALUES (%s, %s);
@@ -514,74 +809,111 @@ def add_link_snapshot(link_id: int, snapshot_url: str) -> None:
         )
 
 
-def store_link_embedding(link_id: int, embedding: Iterable[float], model: Optional[str]) -> None:
-    """Persists an embedding vector for a link."""
-    if not embedding:
-        return
+def _fingerprint(value: Any) -> bytes:
+    """Compact digest of an annotation payload, stable across dict ordering."""
+    encoded = json.dumps(value, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.blake2b(encoded.encode("utf-8"), digest_size=16).digest()
 
-    with _cursor(commit=True) as cur:
-        cur.execute(
-            """
-            INSERT INTO link_embeddings (link_id, embedding, model)
-            VALUES (%s, %s, %s)
-            ON CONFLICT (link_id) DO UPDATE SET
-                embedding = EXCLUDED.embedding,
-                model     = EXCLUDED.model,
-                created_at = CURRENT_TIMESTAMP;
-            """,
-            (link_id, Json(list(embedding)), model),
-        )
 
+def save_link_bundle(
+    user_id: int,
+    url: str,
+    *,
+    title: Optional[str] = None,
+    description: Optional[str] = None,
+    domain: Optional[str] = None,
+    screenshot_path: Optional[str] = None,
+    ai_summary: Optional[str] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+    categories: Optional[Iterable[str]] = None,
+    entities: Optional[Iterable[Dict[str, Any]]] = None,
+    embedding: Optional[Iterable[float]] = None,
+    embedding_model: Optional[str] = None,
+    platform: Optional[str] = "telegram",
+) -> Optional[int]:
+    """
+    Saves a freshly processed link and all of its annotations in a single transaction.
 
-def _ensure_link_metadata_columns(cur) -> None:
-    """Adds newer link_metadata columns when running against an older schema."""
-    global _METADATA_SCHEMA_ENSURED
-    if _METADATA_SCHEMA_ENSURED:
-        return
-
-    cur.execute("ALTER TABLE link_metadata ADD COLUMN IF NOT EXISTS canonical_url TEXT;")
-    cur.execute("ALTER TABLE link_metadata ADD COLUMN IF NOT EXISTS language VARCHAR(20);")
-    cur.execute("ALTER TABLE link_metadata ADD COLUMN IF NOT EXISTS word_count INT;")
-    _METADATA_SCHEMA_ENSURED = True
+    The links row, metadata, categories, entities, embedding and source are written
+    with one connection checkout, one commit and two round trips (the links upsert,
+    then every dependent write at once). Annotations identical to the ones this process
+    last wrote for the link are skipped; the share itself is always recorded.
+    Returns the link_id, or None when the write failed.
+    """
+    annotations = {
+        "metadata": metadata or None,
+        "categories": list(categories) if categories else None,
+        "entities": list(entities) if entities else None,
+        "embedding": [list(embedding), embedding_model] if embedding else None,
+    }
+    fingerprints = {name: _fingerprint(value) for name, value in annotations.items() if value}
+    try:
+        with _cursor(commit=True) as cur:
+            _execute(
+                cur,
+                "save_link_bundle_v2",
+                """
+                INSERT INTO links (user_id, url, title, description, domain, screenshot_path, ai_summary)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (user_id, url)
+                DO UPDATE SET
+                    title           = COALESCE(EXCLUDED.title, links.title),
+                    description     = COALESCE(EXCLUDED.description, links.description),
+                    domain          = COALESCE(EXCLUDED.domain, links.domain),
+                    screenshot_path = COALESCE(EXCLUDED.screenshot_path, links.screenshot_path),
+                    ai_summary      = COALESCE(EXCLUDED.ai_summary, links.ai_summary),
+                    updated_at      = CURRENT_TIMESTAMP
+                RETURNING link_id;
+                """,
+                (user_id, url, title, description, domain, screenshot_path, ai_summary),
+            )
+            row = cur.fetchone()
+            if not row:
+                return None
+            link_id = row[0]
+
+            with _LAST_WRITTEN_LOCK:
+                last_written = _LAST_WRITTEN.get(link_id, {})
+            changed = {name for name, fingerprint in fingerprints.items() if last_written.get(name) != fingerprint}
+
+            # Everything after the links upsert only needs the link_id: send it together.
+            batch = _StatementBatch(cur)
+            if "metadata" in changed:
+                _upsert_link_metadata(batch, link_id, metadata)
+            if "categories" in changed:
+                _insert_link_categories(batch, link_id, annotations["categories"])
+            if "entities" in changed:
+                _insert_link_entities(batch, link_id, annotations["entities"])
+            if "embedding" in changed:
+                _upsert_link_embedding(batch, link_id, annotations["embedding"][0], embedding_model)
+            _insert_link_source(batch, link_id, user_id, platform, None)
+            batch.flush()
+    except psycopg2.Error:
+        logger.exception("Failed to save link bundle for user %s", user_id)
+        return None
 
+    if changed:
+        with _LAST_WRITTEN_LOCK:
+            _LAST_WRITTEN[link_id] = {**_LAST_WRITTEN.get(link_id, {}), **fingerprints}
+    _remember_owner(link_id, user_id)
+    _invalidate(user_id=user_id, link_id=link_id)
+    return link_id
 
-def get_recent_links(user_id: int, limit: int = 5) -> List[Dict[str, Any]]:
-    """Returns the most recently saved links for a user."""
-    with _cursor(dict_cursor=True) as cur:
-        cur.execute(
-            """
-            SELECT
-                l.link_id,
-                l.url,
-                COALESCE(l.title, l.url) AS title,
-                l.description,
-                l.ai_summary,
-                l.domain,
-                l.created_at,
-                ARRAY(
-                    SELECT lc.category FROM link_categories lc WHERE lc.link_id = l.link_id ORDER BY lc.category
-                ) AS categories
-            FROM links l
-            WHERE l.user_id = %s
-            ORDER BY l.created_at DESC
-            LIMIT %s;
-            """,
-            (user_id, limit),
-        )
-        return cur.fetchall()
 
+def get_recent_links(user_id: int, limit: int = 5) -> Sequence[Mapping[str, Any]]:
+    """Returns the most recently saved links for a user (cached briefly, read-only)."""
+    return _cached(
+        _RECENT_LINKS_CACHE, (user_id, limit), lambda: _fetch_recent_links(user_id, limit), user_id
+    )
 
-def search_links(user_id: int, query: str, limit: int = 10) -> List[Dict[str, Any]]:
-    """
-    Performs a lightweight semantic search using text rank and category/entity matches.
-    """
-    if not query:
-        return []
 
+def _fetch_recent_links(user_id: int, limit: int) -> List[Dict[str, Any]]:
     with _cursor(dict_cursor=True) as cur:
-        cur.execute(
+        _execute(
+            cur,
+            "get_recent_links_v1",
             """
-            WITH ranked_links AS (
+            WITH recent AS (
                 SELECT
                     l.link_id,
                     l.url,
@@ -589,181 +921,283 @@ def search_links(user_id: int, query: str, limit: int = 10) -> List[Dict[str, An
                     l.description,
                     l.ai_summary,
                     l.domain,
-                    l.created_at,
-                    ts_rank_cd(
-                        to_tsvector('english', coalesce(l.title, '') || ' ' || coalesce(l.description, '')),
-                        plainto_tsquery('english', %s)
-                    ) AS relevance
+                    l.created_at
                 FROM links l
                 WHERE l.user_id = %s
+                ORDER BY l.created_at DESC
+                LIMIT %s
+            ),
+            categories AS (
+                SELECT lc.link_id, array_agg(lc.category ORDER BY lc.category) AS categories
+                FROM link_categories lc
+                JOIN recent r ON r.link_id = lc.link_id
+                GROUP BY lc.link_id
             )
-            SELECT
-                rl.*,
-                ARRAY(
-                    SELECT lc.category FROM link_categories lc WHERE lc.link_id = rl.link_id ORDER BY lc.category
-                ) AS categories,
-                ARRAY(
-                    SELECT le.entity_name FROM link_entities le WHERE le.link_id = rl.link_id ORDER BY le.entity_name
-                ) AS entities
-            FROM ranked_links rl
-            WHERE rl.relevance > 0
-            ORDER BY rl.relevance DESC, rl.created_at DESC
-            LIMIT %s;
+            SELECT r.*, COALESCE(c.categories, '{}') AS categories
+            FROM recent r
+            LEFT JOIN categories c ON c.link_id = r.link_id
+            ORDER BY r.created_at DESC;
             """,
-            (query, user_id, limit),
+            (user_id, limit),
         )
-        results = cur.fetchall()
+        rows = cur.fetchall()
 
-    # Fallback to ILIKE matching when ts_vector yields nothing.
-    if results:
-        return results
+    for row in rows:
+        _remember_owner(row["link_id"], user_id)
+    return rows
 
-    pattern = f"%{query}%"
-    with _cursor(dict_cursor=True) as cur:
-        cur.execute(
-            """
-            SELECT
-                l.link_id,
-                l.url,
-                COALESCE(l.title, l.url) AS title,
-                l.description,
-                l.ai_summary,
-                l.domain,
-                l.created_at,
-                ARRAY(
-                    SELECT lc.category FROM link_categories lc WHERE lc.link_id = l.link_id
-                ) AS categories,
-                ARRAY(
-                    SELECT le.entity_name FROM link_entities le WHERE le.link_id = l.link_id
-                ) AS entities
-            FROM links l
-            WHERE l.user_id = %s
-              AND (
-                    l.title ILIKE %s
-                 OR l.description ILIKE %s
-                 OR EXISTS (
-                        SELECT 1 FROM link_categories lc WHERE lc.link_id = l.link_id AND lc.category ILIKE %s
-                    )
-                 OR EXISTS (
-                        SELECT 1 FROM link_entities le WHERE le.link_id = l.link_id AND le.entity_name ILIKE %s
-                    )
-              )
-            ORDER BY l.created_at DESC
-            LIMIT %s;
-            """,
-            (user_id, pattern, pattern, pattern, pattern, limit),
-        )
-        return cur.fetchall()
 
+def multi_search_links(
+    user_id: int,
+    phrases: Sequence[Tuple[str, int]],
+    since: Optional[datetime] = None,
+) -> Sequence[Mapping[str, Any]]:
+    """
+    Searches a user's links for several phrases in one round trip.
+
+    ``phrases`` is a list of (phrase, limit) pairs. Each phrase is ranked with full-text
+    search, falling back to ILIKE matching on titles, descriptions, categories and
+    entities when it has no text hits. Results are de-duplicated by link and returned
+    grouped in phrase order, each group by relevance, then newest. When ``since`` is given,
+    only links created at or after it are considered (before each phrase's limit is
+    applied). Repeated searches are served from a short-lived, read-only cache until
+    the user saves or edits a link.
+    """
+    phrases = tuple((phrase, limit) for phrase, limit in phrases if phrase)
+    if not phrases:
+        return []
+    return _cached(
+        _SEARCH_CACHE,
+        (user_id, phrases, since),
+        lambda: _fetch_multi_search_links(user_id, phrases, since),
+        user_id,
+    )
 
-def get_link_stats(user_id: int) -> Dict[str, Any]:
-    """Aggregates high-level stats used by the /stats command."""
-    stats: Dict[str, Any] = {"total_links": 0, "top_categories": [], "top_domains": [], "last_saved_at": None}
 
+def _fetch_multi_search_links(
+    user_id: int,
+    phrases: Sequence[Tuple[str, int]],
+    since: Optional[datetime],
+) -> List[Dict[str, Any]]:
     with _cursor(dict_cursor=True) as cur:
-        cur.execute("SELECT COUNT(*) AS total FROM links WHERE user_id = %s;", (user_id,))
-        row = cur.fetchone()
-        stats["total_links"] = row["total"] if row else 0
-
         cur.execute(
             """
-            SELECT category, COUNT(*) AS count
-            FROM link_categories lc
-            JOIN links l ON lc.link_id = l.link_id
-            WHERE l.user_id = %s
-            GROUP BY category
-            ORDER BY count DESC
-            LIMIT 5;
-            """,
-            (user_id,),
-        )
-        stats["top_categories"] = cur.fetchall()
-
-        cur.execute(
-            """
-            SELECT domain, COUNT(*) AS count
-            FROM links
-            WHERE user_id = %s AND domain IS NOT NULL
-            GROUP BY domain
-            ORDER BY count DESC
-            LIMIT 5;
+            WITH phrases AS (
+                SELECT
+                    p.ord,
+                    p.lim,
+                    plainto_tsquery('english', p.phrase) AS tsq,
+                    '%%' || p.phrase || '%%' AS pattern,
+                    %s::timestamptz AS since
+                FROM unnest(%s::text[], %s::int[]) WITH ORDINALITY AS p(phrase, lim, ord)
+            ),
+            fts AS (
+                SELECT p.ord, t.*
+                FROM phrases p
+                CROSS JOIN LATERAL (
+                    SELECT
+                        l.link_id,
+                        l.url,
+                        COALESCE(l.title, l.url) AS title,
+                        l.description,
+                        l.ai_summary,
+                        l.domain,
+                        l.created_at,
+                        ts_rank_cd(l.search_doc, p.tsq) AS relevance
+                    FROM links l
+                    WHERE l.user_id = %s
+                      AND l.search_doc @@ p.tsq
+                      AND (p.since IS NULL OR l.created_at >= p.since)
+                    ORDER BY relevance DESC, l.created_at DESC
+                    LIMIT p.lim
+                ) t
+            ),
+            fallback AS (
+                SELECT p.ord, t.*
+                FROM phrases p
+                CROSS JOIN LATERAL (
+                    SELECT
+                        l.link_id,
+                        l.url,
+                        COALESCE(l.title, l.url) AS title,
+                        l.description,
+                        l.ai_summary,
+                        l.domain,
+                        l.created_at,
+                        NULL::real AS relevance
+                    FROM links l
+                    WHERE l.user_id = %s
+                      AND (p.since IS NULL OR l.created_at >= p.since)
+                      AND (
+                            l.title ILIKE p.pattern
+                         OR l.description ILIKE p.pattern
+                         OR EXISTS (
+                                SELECT 1 FROM link_categories lc WHERE lc.link_id = l.link_id AND lc.category ILIKE p.pattern
+                            )
+                         OR EXISTS (
+                                SELECT 1 FROM link_entities le WHERE le.link_id = l.link_id AND le.entity_name ILIKE p.pattern
+                            )
+                      )
+                    ORDER BY l.created_at DESC
+                    LIMIT p.lim
+                ) t
+                WHERE NOT EXISTS (SELECT 1 FROM fts f WHERE f.ord = p.ord)
+            ),
+            hits AS (
+                SELECT DISTINCT ON (h.link_id) h.*
+                FROM (SELECT * FROM fts UNION ALL SELECT * FROM fallback) h
+                ORDER BY h.link_id, h.ord
+            ),
+            categories AS (
+                SELECT lc.link_id, array_agg(lc.category ORDER BY lc.category) AS categories
+                FROM link_categories lc
+                JOIN hits h ON h.link_id = lc.link_id
+                GROUP BY lc.link_id
+            ),
+            entities AS (
+                SELECT le.link_id, array_agg(le.entity_name ORDER BY le.entity_name) AS entities
+                FROM link_entities le
+                JOIN hits h ON h.link_id = le.link_id
+                GROUP BY le.link_id
+            )
+            SELECT
+                h.link_id,
+                h.url,
+                h.title,
+                h.description,
+                h.ai_summary,
+                h.domain,
+                h.created_at,
+                h.relevance,
+                COALESCE(c.categories, '{}') AS categories,
+                COALESCE(e.entities, '{}') AS entities
+            FROM hits h
+            LEFT JOIN categories c ON c.link_id = h.link_id
+            LEFT JOIN entities e ON e.link_id = h.link_id
+            ORDER BY h.ord, h.relevance DESC NULLS LAST, h.created_at DESC;
             """,
-            (user_id,),
+            (
+                since,
+                [phrase for phrase, _ in phrases],
+                [limit for _, limit in phrases],
+                user_id,
+                user_id,
+            ),
         )
-        stats["top_domains"] = cur.fetchall()
+        return cur.fetchall()
 
-        cur.execute(
-            """
-            SELECT created_at
-            FROM links
-            WHERE user_id = %s
-            ORDER BY created_at DESC
-            LIMIT 1;
-            """,
-            (user_id,),
-        )
-        last_row = cur.fetchone()
-        stats["last_saved_at"] = last_row["created_at"] if last_row else None
 
-    return stats
+def get_link_stats(user_id: int) -> Mapping[str, Any]:
+    """Aggregates high-level stats used by the /stats command (cached briefly, read-only)."""
+    return _cached(_LINK_STATS_CACHE, user_id, lambda: _fetch_link_stats(user_id), user_id)
 
 
-def get_links_for_export(user_id: int) -> List[Dict[str, Any]]:
-    """Returns all links and annotations needed for export."""
+def _fetch_link_stats(user_id: int) -> Dict[str, Any]:
     with _cursor(dict_cursor=True) as cur:
         cur.execute(
             """
+            WITH user_links AS (
+                SELECT link_id, domain, created_at FROM links WHERE user_id = %s
+            ),
+            top_categories AS (
+                SELECT lc.category, COUNT(*) AS count
+                FROM link_categories lc
+                JOIN user_links ul ON ul.link_id = lc.link_id
+                GROUP BY lc.category
+                ORDER BY count DESC
+                LIMIT 5
+            ),
+            top_domains AS (
+                SELECT domain, COUNT(*) AS count
+                FROM user_links
+                WHERE domain IS NOT NULL
+                GROUP BY domain
+                ORDER BY count DESC
+                LIMIT 5
+            )
             SELECT
-                l.link_id,
-                l.url,
-                COALESCE(l.title, l.url) AS title,
-                l.description,
-                l.ai_summary,
-                l.domain,
-                l.created_at,
-                l.updated_at,
-                lm.author,
-                lm.publish_date,
-                lm.read_time,
-                lm.content_type,
-                ARRAY(
-                    SELECT lc.category FROM link_categories lc WHERE lc.link_id = l.link_id ORDER BY lc.category
-                ) AS categories,
-                ARRAY(
-                    SELECT le.entity_name FROM link_entities le WHERE le.link_id = l.link_id ORDER BY le.entity_name
-                ) AS entities,
-                ARRAY(
-                    SELECT ls.snapshot_url FROM link_snapshots ls WHERE ls.link_id = l.link_id ORDER BY ls.created_at DESC
-                ) AS snapshots
-            FROM links l
-            LEFT JOIN link_metadata lm ON lm.link_id = l.link_id
-            WHERE l.user_id = %s
-            ORDER BY l.created_at DESC;
+                (SELECT COUNT(*) FROM user_links) AS total_links,
+                (SELECT MAX(created_at) FROM user_links) AS last_saved_at,
+                COALESCE((SELECT json_agg(tc ORDER BY tc.count DESC) FROM top_categories tc), '[]') AS top_categories,
+                COALESCE((SELECT json_agg(td ORDER BY td.count DESC) FROM top_domains td), '[]') AS top_domains;
             """,
             (user_id,),
         )
-        return cur.fetchall()
+        row = cur.fetchone()
 
+    if not row:
+        return {"total_links": 0, "top_categories": [], "top_domains": [], "last_saved_at": None}
+    return dict(row)
 
-def get_link_by_id(link_id: int) -> Optional[Dict[str, Any]]:
-    """Fetches a single link by primary key."""
-    with _cursor(dict_cursor=True) as cur:
-        cur.execute(
-            """
-            SELECT
-                l.*,
-                lm.favicon,
-                lm.author,
-                lm.publish_date,
-                lm.read_time,
-                lm.content_type
-            FROM links l
-            LEFT JOIN link_metadata lm ON lm.link_id = l.link_id
-            WHERE l.link_id = %s;
-            """,
-            (link_id,),
-        )
-        return cur.fetchone()
+
+def iter_links_for_export(user_id: int, itersize: int = 1000) -> Iterator[Dict[str, Any]]:
+    """
+    Yields a user's links for export one row at a time.
+
+    Rows are streamed through a named (server-side) cursor in batches of ``itersize``,
+    so memory stays flat no matter how many links the user has saved. The pooled
+    connection is held until the generator is exhausted or closed.
+    """
+    with _connection() as conn:
+        cur = conn.cursor(name=f"export_{user_id}", cursor_factory=_DICT_CURSOR_FACTORY)
+        cur.itersize = itersize
+        try:
+            # Aggregate each child table once per user rather than once per link; separate
+            # CTEs also avoid the categories x entities x snapshots cross product of a flat join.
+            cur.execute(
+                """
+                WITH user_links AS (
+                    SELECT link_id FROM links WHERE user_id = %s
+                ),
+                categories AS (
+                    SELECT lc.link_id, array_agg(lc.category ORDER BY lc.category) AS categories
+                    FROM link_categories lc
+                    JOIN user_links ul ON ul.link_id = lc.link_id
+                    GROUP BY lc.link_id
+                ),
+                entities AS (
+                    SELECT le.link_id, array_agg(le.entity_name ORDER BY le.entity_name) AS entities
+                    FROM link_entities le
+                    JOIN user_links ul ON ul.link_id = le.link_id
+                    GROUP BY le.link_id
+                ),
+                snapshots AS (
+                    SELECT ls.link_id, array_agg(ls.snapshot_url ORDER BY ls.created_at DESC) AS snapshots
+                    FROM link_snapshots ls
+                    JOIN user_links ul ON ul.link_id = ls.link_id
+                    GROUP BY ls.link_id
+                )
+                SELECT
+                    l.link_id,
+                    l.url,
+                    COALESCE(l.title, l.url) AS title,
+                    l.description,
+                    l.ai_summary,
+                    l.domain,
+                    l.created_at,
+                    l.updated_at,
+                    lm.author,
+                    lm.publish_date,
+                    lm.read_time,
+                    lm.content_type,
+                    COALESCE(c.categories, '{}') AS categories,
+                    COALESCE(e.entities, '{}') AS entities,
+                    COALESCE(s.snapshots, '{}') AS snapshots
+                FROM links l
+                LEFT JOIN link_metadata lm ON lm.link_id = l.link_id
+                LEFT JOIN categories c ON c.link_id = l.link_id
+                LEFT JOIN entities e ON e.link_id = l.link_id
+                LEFT JOIN snapshots s ON s.link_id = l.link_id
+                WHERE l.user_id = %s
+                ORDER BY l.created_at DESC;
+                """,
+                (user_id, user_id),
+            )
+            yield from cur
+        finally:
+            cur.close()
+            # End the read-only transaction the named cursor opened.
+            conn.rollback()
 
 
 if __name__ == "__main__":
@@ -1,16 +1,43 @@
+import asyncio
 import csv
 import io
 import logging
 import re
+import tempfile
 from datetime import datetime
 from html import escape
-from typing import Any, Dict, List, Optional
+from itertools import chain, islice
+from typing import (
+    IO,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+)
+
+from cachetools import TTLCache
+
+try:
+    import re2
+except ImportError:  # Optional linear-time regex engine for URL detection.
+    re2 = None
 
-from telegram import Update
+from telegram import Message, Update, User
 from telegram.constants import ParseMode
+from telegram.error import TelegramError
 from telegram.ext import ContextTypes
 
 import database
+import link_cache
+from config import get_config
 from link_archiver import archive_link
 from link_intelligence import analyze_text_content, generate_embedding
 from link_processor import process_url
@@ -18,80 +45,155 @@ from link_retriever import find_links_by_query
 
 logger = logging.getLogger(__name__)
 
-URL_PATTERN = re.compile(
+config = get_config()
+
+# RE2 matches in linear time, so long adversarial messages can't make the URL scan
+# backtrack; the stdlib engine is used when google-re2 isn't installed.
+URL_PATTERN = (re2 or re).compile(
     r"https?://(?:www\.)?[-a-zA-Z0-9@:%._\+~#=]{1,256}\."
     r"[a-zA-Z0-9()]{1,6}\b(?:[-a-zA-Z0-9()@:%_\+.~#?&//=]*)"
 )
+# Interstitials and consent walls that are not worth an OpenAI call when they make up most of a page.
+BOILERPLATE_PATTERN = re.compile(
+    r"(enable javascript|are you a human|access denied|cookies? (?:policy|banner))",
+    re.IGNORECASE,
+)
+BOILERPLATE_MAX_WORDS = 150
+# Tags and character references in outgoing HTML; long replies are only cut between them.
+HTML_TOKEN_PATTERN = re.compile(r"<[^>]*>|&#?\w+;")
+HTML_TAG_PATTERN = re.compile(r"<[^>]*>")
+
+# /export writes CSV text in ~64 KB slices; the spooled file moves to disk past 1 MB.
+EXPORT_FLUSH_CHARS = 64 * 1024
+EXPORT_SPOOL_MAX_BYTES = 1 << 20
+EXPORT_BATCH_ROWS = 500
+EXPORT_HEADER = (
+    "Title",
+    "URL",
+    "Summary",
+    "Description",
+    "Domain",
+    "Categories",
+    "Entities",
+    "Author",
+    "Content Type",
+    "Published",
+    "Created At",
+    "Updated At",
+    "Snapshots",
+)
+
+WELCOME_TEXT = (
+    "Welcome to Silo! 🧠 Your intelligent link manager.\n\n"
+    "Send me a link and I will fetch the metadata, extract key topics, and make it searchable.\n"
+    "Use /help to see everything I can do."
+)
+HELP_TEXT = (
+    "<b>Silo — Your Intelligent Link Manager</b>\n\n"
+    "Save, organise, and rediscover the links your team shares.\n\n"
+    "<b>Commands</b>\n"
+    "• /recent — Show your latest saved links\n"
+    "• /search &lt;query&gt; — Search your saved links\n"
+    "• /stats — Quick stats about your knowledge base\n"
+    "• /export — Download a CSV of your links\n"
+    "• /archive &lt;url&gt; — Capture a snapshot of a page\n"
+    "• /help — Show this menu\n\n"
+    "<b>Try queries like</b>\n"
+    "• articles about onboarding from last week\n"
+    "• video shared by Sarah about marketing\n"
+    "• form we filled out yesterday\n"
+)
+EMPTY_RECENT_MSG = "No links yet. Share a URL and I'll save it for you."
+EMPTY_STATS_MSG = "No stats yet — start by saving a link."
+EMPTY_EXPORT_MSG = "Nothing to export yet — send me a link first."
+
+# Link messages are acknowledged immediately and processed by one worker per chat, so a
+# slow page only delays later links from the same chat. At most config.MAX_ACTIVE_CHATS
+# chats run the ingest pipeline at once. The acknowledgement is later edited into the result.
+# On shutdown, queued links get CHAT_WORKER_DRAIN_SECONDS to finish before workers are cancelled.
+PROCESSING_ACK = "⏳ Processing…"
+CHAT_WORKER_DRAIN_SECONDS = 20
+# Within one message, at most this many URLs are fetched and analysed at the same time.
+MAX_PARALLEL_URLS = 4
+CHAT_WORKER_IDLE_SECONDS = 60
+_QueuedLinks = Tuple[Update, int, List[str], str, "asyncio.Future[Optional[Message]]"]
+_CHAT_QUEUES: Dict[int, "asyncio.Queue[_QueuedLinks]"] = {}
+_CHAT_WORKERS: Set["asyncio.Task[None]"] = set()
+_INGEST_SEMAPHORE: Optional[asyncio.Semaphore] = None
+
+# Identical work already in flight (the same page being fetched for another chat, the same
+# search sent twice) is awaited rather than repeated. Event-loop only, like _SEEN_USERS.
+_IN_FLIGHT: Dict[Hashable, "asyncio.Future[Any]"] = {}
+_T = TypeVar("_T")
+
+
+class _OwnerCancelled(Exception):
+    """Set on a shared future whose owner was cancelled, so waiters retry the work."""
+
+# (user_id, username) pairs upserted recently; a renamed user misses and is re-upserted.
+# Only touched from the event loop, so no lock is needed.
+_SEEN_USERS: TTLCache = TTLCache(maxsize=100_000, ttl=3600)
+
+
+async def _ensure_user(user: User) -> None:
+    """Upserts the Telegram user at most once an hour per (id, username)."""
+    key = (user.id, user.username)
+    if key in _SEEN_USERS:
+        return
+    await asyncio.to_thread(database.add_user, user.id, user.username)
+    _SEEN_USERS[key] = True
 
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
-    database.add_user(user.id, user.username)
-    await update.message.reply_text(
-        "Welcome to Silo! 🧠 Your intelligent link manager.\n\n"
-        "Send me a link and I will fetch the metadata, extract key topics, and make it searchable.\n"
-        "Use /help to see everything I can do."
-    )
+    await _ensure_user(user)
+    await update.message.reply_text(WELCOME_TEXT)
 
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    help_text = (
-        "<b>Silo — Your Intelligent Link Manager</b>\n\n"
-        "Save, organise, and rediscover the links your team shares.\n\n"
-        "<b>Commands</b>\n"
-        "• /recent — Show your latest saved links\n"
-        "• /search &lt;query&gt; — Search your saved links\n"
-        "• /stats — Quick stats about your knowledge base\n"
-        "• /export — Download a CSV of your links\n"
-        "• /archive &lt;url&gt; — Capture a snapshot of a page\n"
-        "• /help — Show this menu\n\n"
-        "<b>Try queries like</b>\n"
-        "• articles about onboarding from last week\n"
-        "• video shared by Sarah about marketing\n"
-        "• form we filled out yesterday\n"
-    )
-    await update.message.reply_text(help_text, parse_mode=ParseMode.HTML)
+    await update.message.reply_text(HELP_TEXT, parse_mode=ParseMode.HTML)
 
 
 async def recent_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
-    database.add_user(user.id, user.username)
-    links = database.get_recent_links(user.id, limit=5)
+    await _ensure_user(user)
+    links = await asyncio.to_thread(database.get_recent_links, user.id, limit=5)
 
     if not links:
-        await update.message.reply_text("No links yet. Share a URL and I'll save it for you.")
+        await update.message.reply_text(EMPTY_RECENT_MSG)
         return
 
-    message = "\n\n".join(_render_link_entry(link) for link in links)
-    await update.message.reply_text(message, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
+    await _reply_html_blocks(update, (_render_link_entry(link) for link in links))
 
 
 async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
-    database.add_user(user.id, user.username)
+    await _ensure_user(user)
 
     query = " ".join(context.args).strip()
     if not query:
         await update.message.reply_text("Please provide a search query, e.g. <code>/search articles about AI</code>", parse_mode=ParseMode.HTML)
         return
 
-    results = find_links_by_query(user.id, query, limit=7)
+    results = await _single_flight(
+        ("search", user.id, query, 7),
+        lambda: asyncio.to_thread(find_links_by_query, user.id, query, limit=7),
+    )
     if not results:
         await update.message.reply_text("I couldn't find anything for that query yet. Try different keywords or add more context.")
         return
 
     header = f"<b>Search results for:</b> {escape(query)}"
-    body = "\n\n".join(_render_link_entry(link) for link in results)
-    await update.message.reply_text(f"{header}\n\n{body}", parse_mode=ParseMode.HTML, disable_web_page_preview=True)
+    await _reply_html_blocks(update, [header, *(_render_link_entry(link) for link in results)])
 
 
 async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
-    database.add_user(user.id, user.username)
-    stats = database.get_link_stats(user.id)
+    await _ensure_user(user)
+    stats = await asyncio.to_thread(database.get_link_stats, user.id)
 
     if stats["total_links"] == 0:
-        await update.message.reply_text("No stats yet — start by saving a link.")
+        await update.message.reply_text(EMPTY_STATS_MSG)
         return
 
     top_categories = ", ".join(
@@ -114,77 +216,89 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(message, parse_mode=ParseMode.HTML)
 
 
-async def export_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    user = update.effective_user
-    database.add_user(user.id, user.username)
-    links = database.get_links_for_export(user.id)
-
-    if not links:
-        await update.message.reply_text("Nothing to export yet — send me a link first.")
-        return
-
-    buffer = io.StringIO()
-    writer = csv.writer(buffer)
-    writer.writerow(
-        [
-            "Title",
-            "URL",
-            "Summary",
-            "Description",
-            "Domain",
-            "Categories",
-            "Entities",
-            "Author",
-            "Content Type",
-            "Published",
-            "Created At",
-            "Updated At",
-            "Snapshots",
-        ]
-    )
-
+def _export_rows(links: Iterable[Dict[str, Any]]) -> Iterator[Tuple[Any, ...]]:
+    """Lazily maps exported link rows to CSV tuples, in EXPORT_HEADER order."""
     for link in links:
-        writer.writerow(
-            [
-                link.get("title") or "",
-                link.get("url") or "",
-                link.get("ai_summary") or "",
-                link.get("description") or "",
-                link.get("domain") or "",
-                ", ".join(link.get("categories") or []),
-                ", ".join(link.get("entities") or []),
-                link.get("author") or "",
-                link.get("content_type") or "",
-                link.get("publish_date") or "",
-                link.get("created_at") or "",
-                link.get("updated_at") or "",
-                ", ".join(link.get("snapshots") or []),
-            ]
+        get = link.get
+        yield (
+            get("title") or "",
+            get("url") or "",
+            get("ai_summary") or "",
+            get("description") or "",
+            get("domain") or "",
+            ", ".join(get("categories") or ()),
+            ", ".join(get("entities") or ()),
+            get("author") or "",
+            get("content_type") or "",
+            get("publish_date") or "",
+            get("created_at") or "",
+            get("updated_at") or "",
+            ", ".join(get("snapshots") or ()),
         )
 
-    csv_bytes = buffer.getvalue().encode("utf-8")
-    filename = f"silo_links_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv"
-    file_like = io.BytesIO(csv_bytes)
-    file_like.name = filename
 
-    await context.bot.send_document(
-        chat_id=update.effective_chat.id,
-        document=file_like,
-        filename=filename,
-        caption="Here is your Silo export.",
-    )
+def _build_export_csv(user_id: int) -> Tuple[int, IO[bytes]]:
+    """
+    Renders a user's links as CSV, returning the row count and a file positioned at the start.
+
+    Rows are written through a small text buffer that is flushed into a spooled
+    temporary file, so large exports spill to disk instead of being held in memory.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_BYTES)
+    try:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_HEADER)
+
+        exported = 0
+        rows = _export_rows(database.iter_links_for_export(user_id))
+        # writerows runs the per-row loop in C; batching keeps the text buffer flushes bounded.
+        for batch in iter(lambda: list(islice(rows, EXPORT_BATCH_ROWS)), []):
+            writer.writerows(batch)
+            exported += len(batch)
+            if buffer.tell() >= EXPORT_FLUSH_CHARS:
+                spool.write(buffer.getvalue().encode("utf-8"))
+                buffer.seek(0)
+                buffer.truncate()
+
+        spool.write(buffer.getvalue().encode("utf-8"))
+        spool.seek(0)
+    except BaseException:
+        # The caller only takes ownership of the file on success.
+        spool.close()
+        raise
+    return exported, spool
+
+
+async def export_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user = update.effective_user
+    await _ensure_user(user)
+    exported, export_file = await asyncio.to_thread(_build_export_csv, user.id)
+
+    with export_file:
+        if not exported:
+            await update.message.reply_text(EMPTY_EXPORT_MSG)
+            return
+
+        filename = f"silo_links_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv"
+        await context.bot.send_document(
+            chat_id=update.effective_chat.id,
+            document=export_file,
+            filename=filename,
+            caption="Here is your Silo export.",
+        )
 
 
 async def archive_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
-    database.add_user(user.id, user.username)
+    await _ensure_user(user)
 
     url = " ".join(context.args).strip()
     if not url:
         await update.message.reply_text("Please provide a URL to archive, e.g. <code>/archive https://example.com</code>", parse_mode=ParseMode.HTML)
         return
 
-    link_id = database.add_link(user.id, url)
+    link_id = await asyncio.to_thread(database.add_link, user.id, url)
     if not link_id:
         await update.message.reply_text("I couldn't register that link. Please try again.")
         return
@@ -202,161 +316,295 @@ async def archive_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle messages containing links or natural language queries."""
     user = update.effective_user
-    database.add_user(user.id, user.username)
+    await _ensure_user(user)
 
     message_text = (update.message.text or "").strip()
-    urls = URL_PATTERN.findall(message_text)
+    urls, user_note = _split_message(message_text)
 
     if urls:
-        await handle_urls(update, user.id, urls)
+        await _enqueue_urls(update, user.id, urls, user_note)
         return
 
     await handle_natural_language_query(update, user.id, message_text)
 
 
-async def handle_urls(update: Update, user_id: int, urls: List[str]):
-    """Process and save detected URLs."""
-    results: List[Dict[str, str]] = []
-    user_note = _extract_user_note(update.message.text or "")
-
-    for url in urls:
-        logger.info("Processing link shared by %s: %s", user_id, url)
-        try:
-            page = process_url(url)
-            if not page:
-                # More informative error message with encouragement to add context
-                results.append({
-                    "status": "error", 
-                    "message": f"⚠️ I couldn't read the content from {url}. This might be due to:\n"
-                              "• Login required\n• JavaScript-heavy page\n• Regional restrictions\n• Network issues\n\n"
-                              "💡 I can still save the link! Just add some context about what this link is for, "
-                              "and I'll store it with your description so you can find it later."
-                })
-                
-                # Still try to save the link with user context if provided
-                if user_note:
-                    try:
-                        link_id = database.add_link(user_id, url, description=user_note)
-                        if link_id:
-                            database.update_link_details(link_id, ai_summary=f"Saved with user context: {user_note}")
-                            database.record_link_source(link_id, shared_by_user_id=user_id, platform="telegram")
-                            results.append({
-                                "status": "saved_context_only",
-                                "message": f"✅ Link saved with your context: \"{user_note}\"\n"
-                                          f"🔍 You can search for it later using your description."
-                            })
-                    except Exception as save_exc:
-                        logger.warning("Failed to save link with user context: %s", save_exc)
-                continue
-
-            metadata = page["metadata"]
-            resolved_url = page.get("resolved_url", url)
-            link_description = metadata.get("description") or (user_note or None)
-            screenshot_path = page.get("screenshot_path")
-            extraction_method = page.get("extraction_method")
-            link_id = database.add_link(
-                user_id,
-                resolved_url,
-                title=metadata.get("title"),
-                description=link_description,
-                domain=metadata.get("domain"),
-            )
-
-            if not link_id:
-                results.append({"status": "error", "message": f"⚠️ Couldn't save {resolved_url}"})
+async def _enqueue_urls(update: Update, user_id: int, urls: List[str], user_note: str) -> None:
+    """Acknowledges a link message and hands it to its chat's worker."""
+    chat_id = update.effective_chat.id
+    queue = _CHAT_QUEUES.get(chat_id)
+    if queue is None:
+        queue = _CHAT_QUEUES[chat_id] = asyncio.Queue()
+        worker = asyncio.create_task(_chat_worker(chat_id, queue))
+        _CHAT_WORKERS.add(worker)
+        worker.add_done_callback(_CHAT_WORKERS.discard)
+    # Queue before acknowledging so the chat's messages keep their order; the worker
+    # picks the acknowledgement up from the future once it has been sent.
+    placeholder: "asyncio.Future[Optional[Message]]" = asyncio.get_running_loop().create_future()
+    queue.put_nowait((update, user_id, urls, user_note, placeholder))
+    ack = None
+    try:
+        ack = await update.message.reply_text(PROCESSING_ACK)
+    finally:
+        placeholder.set_result(ack)
+
+
+async def _chat_worker(chat_id: int, queue: "asyncio.Queue[_QueuedLinks]") -> None:
+    """Drains one chat's link messages in order; exits after CHAT_WORKER_IDLE_SECONDS of quiet."""
+    global _INGEST_SEMAPHORE
+    if _INGEST_SEMAPHORE is None:
+        _INGEST_SEMAPHORE = asyncio.Semaphore(config.MAX_ACTIVE_CHATS)
+
+    try:
+        while True:
+            try:
+                update, user_id, urls, user_note, placeholder = await asyncio.wait_for(
+                    queue.get(), timeout=CHAT_WORKER_IDLE_SECONDS
+                )
+            except asyncio.TimeoutError:
+                if queue.empty():
+                    return
                 continue
 
-            database.update_link_details(
-                link_id,
-                title=metadata.get("title"),
-                description=link_description,
-                domain=metadata.get("domain"),
-                screenshot_path=screenshot_path,
-                archived_html=page.get("html"),
-            )
-            database.add_link_metadata(link_id, metadata)
-
-            text_content = (page["text_content"] or "").strip()
-            ai_analysis = None
-            categories: List[str] = []
-            entities: List[Dict[str, Any]] = []
-            warning: Optional[str] = None
-
-            if text_content:
-                ai_analysis = await analyze_text_content(text_content, user_context=user_note)
-
-                categories = ai_analysis.get("categories") or []
-                if categories:
-                    database.add_link_categories(link_id, categories)
-
-                entities = ai_analysis.get("entities") or []
-                if entities:
-                    database.add_link_entities(link_id, entities)
-
-                database.update_link_details(link_id, ai_summary=ai_analysis.get("summary"))
-
-                embedding_payload = await generate_embedding(text_content[:4000])
-                if embedding_payload and embedding_payload.get("vector"):
-                    database.store_link_embedding(
-                        link_id,
-                        embedding_payload["vector"],
-                        embedding_payload["model"],
+            try:
+                async with _INGEST_SEMAPHORE:
+                    await handle_urls(update, user_id, urls, user_note, placeholder=await placeholder)
+            except Exception:  # noqa: broad-except -- one bad message must not stop the chat's worker.
+                logger.exception("Failed to process links for chat %s", chat_id)
+            finally:
+                queue.task_done()
+    finally:
+        # However the worker ends, let the chat's next message start a fresh one.
+        if _CHAT_QUEUES.get(chat_id) is queue:
+            del _CHAT_QUEUES[chat_id]
+
+
+async def stop_chat_workers() -> None:
+    """Lets queued link messages finish (up to CHAT_WORKER_DRAIN_SECONDS), then cancels the workers."""
+    queues = list(_CHAT_QUEUES.values())
+    if queues:
+        _, pending = await asyncio.wait(
+            [asyncio.ensure_future(queue.join()) for queue in queues], timeout=CHAT_WORKER_DRAIN_SECONDS
+        )
+        for joiner in pending:
+            joiner.cancel()
+        dropped = sum(queue.qsize() for queue in queues)
+        if dropped:
+            logger.warning("Shutting down with %s queued link messages unprocessed", dropped)
+
+    workers = list(_CHAT_WORKERS)
+    for worker in workers:
+        worker.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def _single_flight(key: Hashable, work: Callable[[], Awaitable[_T]]) -> _T:
+    """Runs ``work`` once for concurrent callers sharing ``key``; the others await its outcome."""
+    pending = _IN_FLIGHT.get(key)
+    while pending is not None:
+        try:
+            # shield: a cancelled waiter must not cancel the owner's shared future.
+            return await asyncio.shield(pending)
+        except _OwnerCancelled:
+            # The owner's cancellation is not ours; take over (or join whoever did).
+            pending = _IN_FLIGHT.get(key)
+
+    future: "asyncio.Future[Any]" = asyncio.get_running_loop().create_future()
+    _IN_FLIGHT[key] = future
+    try:
+        result = await work()
+    except asyncio.CancelledError:
+        future.set_exception(_OwnerCancelled())
+        future.exception()  # Waiters may all be gone; don't log it as unretrieved.
+        raise
+    except Exception as exc:
+        future.set_exception(exc)
+        future.exception()  # Mark retrieved so an unawaited failure is not logged twice.
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        _IN_FLIGHT.pop(key, None)
+
+
+def _worth_analysing(text_content: str) -> bool:
+    """Returns False for empty, tiny, or boilerplate-only page text."""
+    # maxsplit bounds the scan: we only need to know whether the page clears each threshold.
+    word_count = len(text_content.split(None, BOILERPLATE_MAX_WORDS))
+    if word_count < config.MIN_ANALYSIS_WORDS:
+        return False
+    return word_count > BOILERPLATE_MAX_WORDS or not BOILERPLATE_PATTERN.search(text_content)
+
+
+async def _process_one(user_id: int, url: str, user_note: str) -> List[Dict[str, Any]]:
+    """Fetches, analyses and saves a single URL, returning the result entries to report."""
+    results: List[Dict[str, Any]] = []
+    logger.info("Processing link shared by %s: %s", user_id, url)
+    try:
+        page = await _single_flight(("page", link_cache.normalize_url(url)), lambda: link_cache.load_page(url, process_url))
+        if not page:
+            # More informative error message with encouragement to add context
+            results.append({
+                "status": "error", 
+                "message": f"⚠️ I couldn't read the content from {url}. This might be due to:\n"
+                          "• Login required\n• JavaScript-heavy page\n• Regional restrictions\n• Network issues\n\n"
+                          "💡 I can still save the link! Just add some context about what this link is for, "
+                          "and I'll store it with your description so you can find it later."
+            })
+            
+            # Still try to save the link with user context if provided
+            if user_note:
+                try:
+                    link_id = await asyncio.to_thread(
+                        database.save_link_bundle,
+                        user_id,
+                        url,
+                        description=user_note,
+                        ai_summary=f"Saved with user context: {user_note}",
                     )
+                    if link_id:
+                        results.append({
+                            "status": "saved_context_only",
+                            "message": f"✅ Link saved with your context: \"{user_note}\"\n"
+                                      f"🔍 You can search for it later using your description."
+                        })
+                except Exception as save_exc:
+                    logger.warning("Failed to save link with user context: %s", save_exc)
+            return results
+
+        metadata = page["metadata"]
+        resolved_url = page.get("resolved_url", url)
+        link_description = metadata.get("description") or (user_note or None)
+        screenshot_path = page.get("screenshot_path")
+        extraction_method = page.get("extraction_method")
+
+        text_content = (page["text_content"] or "").strip()
+        ai_analysis = None
+        ai_summary: Optional[str] = None
+        categories: List[str] = []
+        entities: List[Dict[str, Any]] = []
+        embedding_payload: Optional[Dict[str, Any]] = None
+        warning: Optional[str] = None
+
+        if _worth_analysing(text_content):
+            ai_analysis = await analyze_text_content(text_content, user_context=user_note)
+            categories = ai_analysis.get("categories") or []
+            entities = ai_analysis.get("entities") or []
+            ai_summary = ai_analysis.get("summary")
+            embedding_payload = await generate_embedding(text_content)
+        elif text_content:
+            # Readable, but too short or boilerplate to be worth an analysis call.
+            word_count = len(text_content.split())
+            if user_note:
+                ai_summary = f"Saved with your description: {user_note}"
             else:
-                # Graceful handling when no text content is available
-                if user_note:
-                    fallback_summary = f"Saved with your description: {user_note}"
-                    database.update_link_details(link_id, ai_summary=fallback_summary)
-                    warning = (
-                        "📄 I couldn't read the page content, but I've saved your link with the context you provided. "
-                        "You can search for it using your description!"
-                    )
-                else:
-                    fallback_summary = metadata.get("description") or "Link saved. Next time, add a description to make it easier to find!"
-                    database.update_link_details(link_id, ai_summary=fallback_summary)
-                    warning = (
-                        "📄 I couldn't read the page content (it might require login or have heavy JavaScript). "
-                        "💡 Next time, try adding a description like: 'This is a tutorial about...' or 'Important docs for...'"
-                    )
+                ai_summary = metadata.get("description") or "Link saved. Next time, add a description to make it easier to find!"
+            warning = (
+                f"📄 This page only has {word_count} words of readable text (or mostly a cookie/login notice), "
+                "so I saved it without AI tags."
+            )
+        else:
+            # Graceful handling when no text content is available
+            if user_note:
+                ai_summary = f"Saved with your description: {user_note}"
+                warning = (
+                    "📄 I couldn't read the page content, but I've saved your link with the context you provided. "
+                    "You can search for it using your description!"
+                )
+            else:
+                ai_summary = metadata.get("description") or "Link saved. Next time, add a description to make it easier to find!"
+                warning = (
+                    "📄 I couldn't read the page content (it might require login or have heavy JavaScript). "
+                    "💡 Next time, try adding a description like: 'This is a tutorial about...' or 'Important docs for...'"
+                )
 
-            database.record_link_source(link_id, shared_by_user_id=user_id, platform="telegram")
+        # Analysis doesn't need a link_id, so every write happens afterwards in one transaction.
+        link_id = await asyncio.to_thread(
+            database.save_link_bundle,
+            user_id,
+            resolved_url,
+            title=metadata.get("title"),
+            description=link_description,
+            domain=metadata.get("domain"),
+            screenshot_path=screenshot_path,
+            ai_summary=ai_summary,
+            metadata=metadata,
+            categories=categories,
+            entities=entities,
+            embedding=embedding_payload.get("vector") if embedding_payload else None,
+            embedding_model=embedding_payload.get("model") if embedding_payload else None,
+        )
 
-            # Enhanced confirmation with validation details
-            success_summary = ai_analysis.get("summary") if ai_analysis else (user_note or metadata.get("description") or "Saved successfully.")
-            
-            # Create detailed confirmation message
-            confirmation_parts = []
-            if user_note:
-                confirmation_parts.append(f"✅ **Saved with your context:** {user_note}")
-            
-            confirmation_parts.extend([
-                f"📄 **Content analyzed:** {len(text_content.split()) if text_content else 0} words processed",
-                f"🏷️ **Categories:** {', '.join(categories[:3]) if categories else 'General'}"
-            ])
-            
-            if entities:
-                entity_names = [e.get('name', 'Unknown') for e in entities[:3]]
-                confirmation_parts.append(f"🔍 **Key entities:** {', '.join(entity_names)}")
-            
-            confirmation_message = "\n".join(confirmation_parts)
-            
-            results.append(
-                {
-                    "status": "ok",
-                    "title": metadata.get("title") or resolved_url,
-                    "url": resolved_url,
-                    "summary": success_summary,
-                    "categories": categories,
-                    "warning": warning,
-                    "extraction_method": extraction_method,
-                    "confirmation": confirmation_message,
-                    "entities_count": len(entities) if entities else 0,
-                    "user_context_used": bool(user_note),
-                }
-            )
-        except Exception as exc:  # noqa: broad-except -- we need to report the failure to the user.
-            logger.exception("Error processing link %s", url)
-            results.append({"status": "error", "message": f"⚠️ Error saving {url}: {exc}"})
+        if not link_id:
+            results.append({"status": "error", "message": f"⚠️ Couldn't save {resolved_url}"})
+            return results
+
+        # Enhanced confirmation with validation details
+        success_summary = ai_analysis.get("summary") if ai_analysis else (user_note or metadata.get("description") or "Saved successfully.")
+        
+        # Create detailed confirmation message
+        confirmation_parts = []
+        if user_note:
+            confirmation_parts.append(f"✅ **Saved with your context:** {user_note}")
+        
+        if ai_analysis is not None:
+            confirmation_parts.append(f"📄 **Content analyzed:** {len(text_content.split())} words processed")
+        else:
+            confirmation_parts.append("📄 **Content:** not analyzed")
+        confirmation_parts.append(f"🏷️ **Categories:** {', '.join(categories[:3]) if categories else 'General'}")
+        
+        if entities:
+            entity_names = [e.get('name', 'Unknown') for e in entities[:3]]
+            confirmation_parts.append(f"🔍 **Key entities:** {', '.join(entity_names)}")
+        
+        confirmation_message = "\n".join(confirmation_parts)
+        
+        results.append(
+            {
+                "status": "ok",
+                "title": metadata.get("title") or resolved_url,
+                "url": resolved_url,
+                "summary": success_summary,
+                "categories": categories,
+                "warning": warning,
+                "extraction_method": extraction_method,
+                "confirmation": confirmation_message,
+                "entities_count": len(entities) if entities else 0,
+                "user_context_used": bool(user_note),
+            }
+        )
+    except Exception as exc:  # noqa: broad-except -- we need to report the failure to the user.
+        logger.exception("Error processing link %s", url)
+        results.append({"status": "error", "message": f"⚠️ Error saving {url}: {exc}"})
+
+    return results
+
+
+async def handle_urls(
+    update: Update,
+    user_id: int,
+    urls: List[str],
+    user_note: Optional[str] = None,
+    *,
+    placeholder: Optional[Message] = None,
+):
+    """
+    Process and save detected URLs; ``user_note`` defaults to the message text minus its URLs.
+    The first reply replaces ``placeholder`` (the processing acknowledgement) when given.
+    """
+    if user_note is None:
+        _, user_note = _split_message(update.message.text or "")
+
+    # Each URL is an independent fetch + LLM + DB pipeline; run them side by side
+    # (bounded) and keep the replies in the order the links were sent.
+    semaphore = asyncio.Semaphore(MAX_PARALLEL_URLS)
+
+    async def _guarded(url: str) -> List[Dict[str, Any]]:
+        async with semaphore:
+            return await _process_one(user_id, url, user_note)
+
+    per_url_results = await asyncio.gather(*(_guarded(url) for url in urls))
+    results = [result for url_results in per_url_results for result in url_results]
 
     message_blocks = []
     for result in results:
@@ -395,11 +643,7 @@ async def handle_urls(update: Update, user_id: int, urls: List[str]):
         else:
             message_blocks.append(escape(result["message"]))
 
-    await update.message.reply_text(
-        "\n\n".join(message_blocks),
-        parse_mode=ParseMode.HTML,
-        disable_web_page_preview=True,
-    )
+    await _reply_html_blocks(update, message_blocks, placeholder=placeholder)
 
 
 async def handle_natural_language_query(update: Update, user_id: int, query: str):
@@ -408,7 +652,10 @@ async def handle_natural_language_query(update: Update, user_id: int, query: str
         await update.message.reply_text("Tell me what you're looking for or send me a link to save.")
         return
 
-    results = find_links_by_query(user_id, query, limit=5)
+    results = await _single_flight(
+        ("search", user_id, query, 5),
+        lambda: asyncio.to_thread(find_links_by_query, user_id, query, limit=5),
+    )
     if not results:
         await update.message.reply_text(
             "I didn't find anything for that. You can try mentioning a person, topic, or time range."
@@ -416,8 +663,86 @@ async def handle_natural_language_query(update: Update, user_id: int, query: str
         return
 
     header = f"<b>Here is what I found for:</b> {escape(query)}"
-    body = "\n\n".join(_render_link_entry(link) for link in results)
-    await update.message.reply_text(f"{header}\n\n{body}", parse_mode=ParseMode.HTML, disable_web_page_preview=True)
+    await _reply_html_blocks(update, [header, *(_render_link_entry(link) for link in results)])
+
+
+async def _reply_html_blocks(
+    update: Update,
+    blocks: Iterable[str],
+    placeholder: Optional[Message] = None,
+) -> None:
+    """
+    Sends HTML blocks separated by blank lines, split across as few messages as fit.
+    The first message is edited into ``placeholder`` when one is given.
+    """
+    for chunk in _iter_message_chunks(blocks):
+        if placeholder is not None:
+            try:
+                await placeholder.edit_text(chunk, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
+                placeholder = None
+                continue
+            except TelegramError as exc:
+                logger.debug("Could not edit placeholder, replying instead: %s", exc)
+                placeholder = None
+        await update.message.reply_text(chunk, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
+
+
+def _iter_message_chunks(blocks: Iterable[str], limit: int = config.MAX_MESSAGE_LENGTH) -> Iterator[str]:
+    """
+    Packs blocks into messages of at most ``limit`` characters, joined by blank lines.
+
+    Blocks are kept whole so their HTML tags stay balanced; only a block that alone
+    exceeds ``limit`` is cut, outside any element or entity, preferably at a line break,
+    then at a space. A single element longer than ``limit`` loses its markup instead.
+    """
+    parts: List[str] = []
+    size = 0
+    for block in blocks:
+        while len(block) > limit:
+            if parts:
+                yield "\n\n".join(parts)
+                parts, size = [], 0
+            cut = _html_cut(block, limit)
+            if cut <= 0:
+                block = HTML_TAG_PATTERN.sub("", block)
+                continue
+            yield block[:cut]
+            block = block[cut:].lstrip()
+        if not block:
+            continue
+        added = len(block) + (2 if parts else 0)
+        if size + added > limit:
+            yield "\n\n".join(parts)
+            parts, size, added = [], 0, len(block)
+        parts.append(block)
+        size += added
+    if parts:
+        yield "\n\n".join(parts)
+
+
+def _html_cut(block: str, limit: int) -> int:
+    """Returns the best index <= ``limit`` to split ``block`` between top-level HTML, or 0."""
+    newline = space = anywhere = 0
+    depth = 0
+    pos = 0
+    for match in chain(HTML_TOKEN_PATTERN.finditer(block), (None,)):
+        if pos > limit:
+            break
+        # block[pos:end] is plain text; at depth 0 every index in it is a safe cut.
+        end = min(match.start() if match else len(block), limit)
+        if depth == 0:
+            newline = max(newline, block.rfind("\n", pos, end))
+            space = max(space, block.rfind(" ", pos, end))
+            anywhere = end
+        if match is None:
+            break
+        token = match.group()
+        if token.startswith("</"):
+            depth = max(depth - 1, 0)
+        elif token.startswith("<") and not token.endswith("/>"):
+            depth += 1
+        pos = match.end()
+    return next((cut for cut in (newline, space, anywhere) if cut > 0), 0)
 
 
 def _render_link_entry(link: Dict[str, Any]) -> str:
@@ -430,26 +755,23 @@ def _render_link_entry(link: Dict[str, Any]) -> str:
         or link.get("description")
         or "Saved."
     )
-    categories = ", ".join(link.get("categories") or [])
-    categories_html = f"<i>Tags:</i> {escape(categories)}" if categories else ""
-
-    parts = [f"• <a href=\"{url}\">{title}</a>", summary]
-    if categories_html:
-        parts.append(categories_html)
-    return "\n".join(parts)
-
-
-def _extract_user_note(message_text: str) -> str:
-    """Extracts and enriches user-provided context from the message by removing URLs."""
-    if not message_text:
-        return ""
-    
-    # Remove URLs but preserve the surrounding context
-    cleaned = URL_PATTERN.sub(" ", message_text)
-    cleaned = re.sub(r"\s+", " ", cleaned).strip()
-    
-    # If the user provided substantial context, preserve it completely
-    if len(cleaned.split()) >= 3:
-        return cleaned
-    
-    return cleaned
+    categories = ", ".join(link.get("categories") or ())
+    if categories:
+        return f"• <a href=\"{url}\">{title}</a>\n{summary}\n<i>Tags:</i> {escape(categories)}"
+    return f"• <a href=\"{url}\">{title}</a>\n{summary}"
+
+
+def _split_message(message_text: str) -> Tuple[List[str], str]:
+    """
+    Splits a message into its URLs and the user's note (the remaining text with
+    whitespace collapsed), in a single scan of the message.
+    """
+    urls: List[str] = []
+    words: List[str] = []
+    position = 0
+    for match in URL_PATTERN.finditer(message_text):
+        urls.append(match.group(0))
+        words.extend(message_text[position:match.start()].split())
+        position = match.end()
+    words.extend(message_text[position:].split())
+    return urls, " ".join(words)
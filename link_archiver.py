@@ -6,24 +6,36 @@ backup so content is still recoverable when the remote archive fails.
 """
 
 import asyncio
+import gzip
 import logging
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, Optional
 
-import requests
+import httpx
+
+try:  # HTTP/2 needs the optional h2 package (httpx[http2]).
+    import h2  # noqa: F401
+except ImportError:  # pragma: no cover - optional dependency
+    _HTTP2_AVAILABLE = False
+else:
+    _HTTP2_AVAILABLE = True
 
 import database
-from config import Config
+import link_cache
+from config import get_config
 from link_processor import process_url
 
 logger = logging.getLogger(__name__)
 
-config = Config()
+config = get_config()
 SNAPSHOT_DIR = Path(config.TEMP_DIR) / "snapshots"
 SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
 
 WAYBACK_SAVE_ENDPOINT = "https://web.archive.org/save/"
+SNAPSHOT_WRITE_CHARS = 64 * 1024
+
+_WB_CLIENT: Optional[httpx.AsyncClient] = None
 
 
 async def archive_link(link_id: int, url: str) -> Optional[str]:
@@ -33,61 +45,80 @@ async def archive_link(link_id: int, url: str) -> Optional[str]:
     """
     wayback_snapshot = await _attempt_wayback_snapshot(url)
     if wayback_snapshot:
-        database.add_link_snapshot(link_id, wayback_snapshot)
+        await asyncio.to_thread(database.add_link_snapshot, link_id, wayback_snapshot)
         return wayback_snapshot
 
     loop = asyncio.get_running_loop()
     try:
-        local_path = await loop.run_in_executor(None, _save_local_snapshot, link_id, url)
+        page = await link_cache.load_page(url, process_url, with_html=True)
+        if not page:
+            return None
+        local_path = await loop.run_in_executor(None, _save_local_snapshot, link_id, page)
         if local_path:
-            database.add_link_snapshot(link_id, local_path)
+            await asyncio.to_thread(database.add_link_snapshot, link_id, local_path)
         return local_path
     except Exception:
         logger.exception("Failed to archive %s locally", url)
         return None
 
 
+def _get_wayback_client() -> httpx.AsyncClient:
+    """Returns the shared Wayback client, creating it inside the running event loop."""
+    global _WB_CLIENT
+    if _WB_CLIENT is None or _WB_CLIENT.is_closed:
+        _WB_CLIENT = httpx.AsyncClient(
+            http2=_HTTP2_AVAILABLE,
+            timeout=20,
+            headers={"User-Agent": "SiloBot/1.0 (+https://telegram.me/silo)"},
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+        )
+    return _WB_CLIENT
+
+
+async def close() -> None:
+    """Closes the shared Wayback client (called on bot shutdown)."""
+    global _WB_CLIENT
+    if _WB_CLIENT is not None:
+        await _WB_CLIENT.aclose()
+        _WB_CLIENT = None
+
+
 async def _attempt_wayback_snapshot(url: str) -> Optional[str]:
     """
     Calls the Wayback Machine Save Page Now endpoint. Returns the archive URL on success.
     This call is best-effort; errors are logged and treated as non-fatal.
     """
-    loop = asyncio.get_running_loop()
-
-    def _request_snapshot() -> Optional[str]:
-        try:
-            headers = {"User-Agent": "SiloBot/1.0 (+https://telegram.me/silo)"}
-            response = requests.get(
-                f"{WAYBACK_SAVE_ENDPOINT}{url}",
-                headers=headers,
-                timeout=20,
-                allow_redirects=False,
-            )
-            if response.status_code in (200, 201, 202):
-                archive_url = response.headers.get("Content-Location")
-                if archive_url:
-                    if not archive_url.startswith("http"):
-                        archive_url = f"https://web.archive.org{archive_url}"
-                    return archive_url
-            logger.info(
-                "Wayback snapshot failed for %s with status %s",
-                url,
-                response.status_code,
-            )
-        except Exception as exc:  # noqa: broad-except - network issues shouldn't break ingestion
-            logger.warning("Wayback snapshot error for %s: %s", url, exc)
-        return None
-
-    return await loop.run_in_executor(None, _request_snapshot)
-
-
-def _save_local_snapshot(link_id: int, url: str) -> Optional[str]:
-    page = process_url(url)
-    if not page or not page.get("html"):
+    try:
+        response = await _get_wayback_client().get(
+            f"{WAYBACK_SAVE_ENDPOINT}{url}",
+            follow_redirects=False,
+        )
+        if response.status_code in (200, 201, 202):
+            archive_url = response.headers.get("Content-Location")
+            if archive_url:
+                if not archive_url.startswith("http"):
+                    archive_url = f"https://web.archive.org{archive_url}"
+                return archive_url
+        logger.info(
+            "Wayback snapshot failed for %s with status %s",
+            url,
+            response.status_code,
+        )
+    except Exception as exc:  # noqa: broad-except - network issues shouldn't break ingestion
+        logger.warning("Wayback snapshot error for %s: %s", url, exc)
+    return None
+
+
+def _save_local_snapshot(link_id: int, page: Dict[str, Any]) -> Optional[str]:
+    if not page.get("html"):
         return None
 
+    html = page["html"]
     timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    snapshot_path = SNAPSHOT_DIR / f"link_{link_id}_{timestamp}.html"
-    snapshot_path.write_text(page["html"], encoding="utf-8")
-    database.update_link_details(link_id, archived_html=page["html"])
+    snapshot_path = SNAPSHOT_DIR / f"link_{link_id}_{timestamp}.html.gz"
+    # Encode and compress slice by slice so the page never exists twice in memory; the
+    # snapshot row written by archive_link references this file instead of inline HTML.
+    with gzip.open(snapshot_path, "wt", encoding="utf-8") as snapshot_file:
+        for start in range(0, len(html), SNAPSHOT_WRITE_CHARS):
+            snapshot_file.write(html[start:start + SNAPSHOT_WRITE_CHARS])
     return str(snapshot_path)
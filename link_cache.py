@@ -0,0 +1,168 @@
+"""
+link_cache.py - Shared Redis cache for processed pages, AI analysis, and embeddings.
+
+Keys are content-addressed (normalised URL or the exact model input), so a link shared
+in many chats is fetched and analysed once. The cache is disabled when REDIS_URL is
+unset, and every Redis failure is treated as a cache miss.
+"""
+
+import asyncio
+import hashlib
+import logging
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import orjson
+import redis.asyncio as redis
+
+from config import get_config
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "silo"
+TRACKING_PARAM_PREFIXES = ("utm_",)
+TRACKING_PARAMS = {"fbclid", "gclid", "igshid", "mc_cid", "mc_eid"}
+
+_client: Optional["redis.Redis"] = None
+
+
+def normalize_url(url: str) -> str:
+    """Canonicalises a URL for cache keys: lowercase scheme/host, no tracking params, sorted query."""
+    parts = urlsplit(url.strip())
+    query = [
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key not in TRACKING_PARAMS and not key.startswith(TRACKING_PARAM_PREFIXES)
+    ]
+    query.sort()
+    return urlunsplit(
+        (
+            parts.scheme.lower(),
+            parts.netloc.lower(),
+            parts.path or "/",
+            urlencode(query, doseq=True),
+            "",
+        )
+    )
+
+
+def _digest(*parts: str) -> str:
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update(part.encode("utf-8"))
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+
+def _get_client() -> Optional["redis.Redis"]:
+    global _client
+    redis_url = get_config().REDIS_URL
+    if not redis_url:
+        return None
+    if _client is None:
+        _client = redis.from_url(redis_url)
+    return _client
+
+
+async def _get_json(key: str) -> Optional[Any]:
+    client = _get_client()
+    if client is None:
+        return None
+    try:
+        raw = await client.get(key)
+    except Exception as exc:  # noqa: broad-except -- the cache must never break ingestion.
+        logger.warning("Link cache read failed for %s: %s", key, exc)
+        return None
+    if raw is None:
+        return None
+    try:
+        return orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        return None
+
+
+async def _set_json(key: str, value: Any, ttl: Optional[int] = None) -> None:
+    client = _get_client()
+    if client is None or value is None:
+        return
+    try:
+        await client.set(key, orjson.dumps(value, default=str), ex=ttl or get_config().LINK_CACHE_TTL)
+    except Exception as exc:  # noqa: broad-except -- the cache must never break ingestion.
+        logger.warning("Link cache write failed for %s: %s", key, exc)
+
+
+def page_key(url: str) -> str:
+    return f"{KEY_PREFIX}:page:{_digest(normalize_url(url))}"
+
+
+def page_html_key(url: str) -> str:
+    return f"{KEY_PREFIX}:html:{_digest(normalize_url(url))}"
+
+
+def analysis_key(text: str, model: str, user_context: Optional[str]) -> str:
+    return f"{KEY_PREFIX}:analysis:{_digest(model, user_context or '', text)}"
+
+
+def embedding_key(text: str, model: str) -> str:
+    return f"{KEY_PREFIX}:embed:{_digest(model, text)}"
+
+
+async def get_page(url: str, *, with_html: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Returns the cached page. Its HTML is kept under a separate, shorter-lived key and
+    only read back for ``with_html`` callers (the archiver); a missing HTML is a miss.
+    """
+    page = await _get_json(page_key(url))
+    if page is not None and with_html:
+        html = await _get_json(page_html_key(url))
+        if html is None:
+            return None
+        page["html"] = html
+    return page
+
+
+async def set_page(url: str, page: Dict[str, Any]) -> None:
+    html = page.get("html")
+    await _set_json(page_key(url), {key: value for key, value in page.items() if key != "html"})
+    if html:
+        await _set_json(page_html_key(url), html, ttl=get_config().LINK_HTML_CACHE_TTL)
+
+
+async def load_page(
+    url: str,
+    fetch: Callable[[str], Optional[Dict[str, Any]]],
+    *,
+    with_html: bool = False,
+) -> Optional[Dict[str, Any]]:
+    """Returns the processed page from the cache, running the blocking ``fetch`` in a thread on a miss."""
+    page = await get_page(url, with_html=with_html)
+    if page is None:
+        # Fetching, parsing, rendering and OCR are blocking; keep them off the event loop.
+        page = await asyncio.to_thread(fetch, url)
+        if page:
+            await set_page(url, page)
+    return page
+
+
+async def get_analysis(text: str, model: str, user_context: Optional[str]) -> Optional[Dict[str, Any]]:
+    return await _get_json(analysis_key(text, model, user_context))
+
+
+async def set_analysis(text: str, model: str, user_context: Optional[str], analysis: Dict[str, Any]) -> None:
+    await _set_json(analysis_key(text, model, user_context), analysis)
+
+
+async def get_embedding(text: str, model: str) -> Optional[List[float]]:
+    return await _get_json(embedding_key(text, model))
+
+
+async def set_embedding(text: str, model: str, vector: List[float]) -> None:
+    await _set_json(embedding_key(text, model), vector)
+
+
+async def close() -> None:
+    """Closes the Redis connection pool (called on bot shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
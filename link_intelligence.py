@@ -3,22 +3,31 @@ link_intelligence.py - AI-powered link understanding utilities.
 """
 
 import asyncio
-import json
 import logging
-from typing import Any, Dict, List, Optional
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
 
-from openai import OpenAI
+import orjson
 
-from config import Config
+try:
+    import tiktoken
+except ImportError:  # Token counting is an optimisation; fall back to character budgets.
+    tiktoken = None
+
+import link_cache
+from config import get_config
 from link_processor import process_url
+from openai_client import async_client
 
 logger = logging.getLogger(__name__)
 
-config = Config()
-client = OpenAI(api_key=config.OPENAI_API_KEY)
+config = get_config()
 
 DEFAULT_MODEL = config.DEFAULT_MODEL or "gpt-4o-mini"
 DEFAULT_EMBEDDING_MODEL = config.EMBEDDING_MODEL or "text-embedding-3-small"
+FALLBACK_MODEL = config.FALLBACK_MODEL or "gpt-4o-mini"
+# Rough characters-per-token ratio used when no tokenizer is available.
+CHARS_PER_TOKEN = 4
 DEFAULT_ANALYSIS = {
     "category": None,
     "categories": [],
@@ -28,12 +37,30 @@ DEFAULT_ANALYSIS = {
     "tags": [],
 }
 
+ANALYSIS_SYSTEM_PROMPT = (
+    "You are an expert content analyst assisting a knowledge management bot. "
+    "Your job is to analyze web content and extract rich, searchable metadata. "
+    "Given cleaned text from a webpage (and optional user context), respond with a JSON object containing:\n"
+    '- type: Primary content type (article, video, form, document, product, tutorial, session, conversation, tool, other).\n'
+    "- topics: 5-8 comprehensive key topics, including technical concepts, tools, and domains mentioned.\n"
+    "- entities: Key people, organizations, products, tools, technologies as objects with `name` and `type` (person/org/product/tool/tech).\n"
+    "- summary: 2-3 sentence human-friendly summary that captures the main value and purpose.\n"
+    "- tags: Rich set of searchable keywords including synonyms, technical terms, and user intent keywords.\n"
+    "- context_keywords: If user context provided, extract additional relevant search terms from user's description.\n"
+    "- emotional_tags: Sentiment/importance indicators from user context (important, useful, reference, example, etc).\n"
+    "\nFocus on making content highly discoverable through natural language search."
+)
+# Built once and shared by every analysis request; the SDK never mutates it.
+ANALYSIS_SYSTEM_MESSAGE = {"role": "system", "content": ANALYSIS_SYSTEM_PROMPT}
+
 
 async def process_link(url: str) -> Dict[str, Any]:
     """
     Fetches, parses, and enriches a link with AI metadata.
     """
-    page = process_url(url)
+    # The fetch/parse/render pipeline is blocking; run it off the event loop so
+    # several links can be enriched concurrently.
+    page = await asyncio.to_thread(process_url, url)
     if not page:
         return {"error": "Failed to fetch URL content."}
 
@@ -56,47 +83,33 @@ async def analyze_text_content(text_content: str, *, model: Optional[str] = None
         logger.info("Skipping AI analysis because no textual content was extracted.")
         return DEFAULT_ANALYSIS.copy()
 
-    system_prompt = (
-        "You are an expert content analyst assisting a knowledge management bot. "
-        "Your job is to analyze web content and extract rich, searchable metadata. "
-        "Given cleaned text from a webpage (and optional user context), respond with a JSON object containing:\n"
-        '- type: Primary content type (article, video, form, document, product, tutorial, session, conversation, tool, other).\n'
-        "- topics: 5-8 comprehensive key topics, including technical concepts, tools, and domains mentioned.\n"
-        "- entities: Key people, organizations, products, tools, technologies as objects with `name` and `type` (person/org/product/tool/tech).\n"
-        "- summary: 2-3 sentence human-friendly summary that captures the main value and purpose.\n"
-        "- tags: Rich set of searchable keywords including synonyms, technical terms, and user intent keywords.\n"
-        "- context_keywords: If user context provided, extract additional relevant search terms from user's description.\n"
-        "- emotional_tags: Sentiment/importance indicators from user context (important, useful, reference, example, etc).\n"
-        "\nFocus on making content highly discoverable through natural language search."
-    )
-
     # Construct user message with content and optional context
     user_message_parts = []
     if user_context:
         user_message_parts.append(f"USER CONTEXT: {user_context}")
         user_message_parts.append("---")
-    user_message_parts.append(f"WEBPAGE CONTENT: {text_content[:6000]}")
-    
-    user_message = "\n".join(user_message_parts)
-    
     model_to_use = model or DEFAULT_MODEL
+    page_excerpt = truncate_to_tokens(text_content, config.ANALYSIS_INPUT_TOKENS, model_to_use)
+    cached = await link_cache.get_analysis(page_excerpt, model_to_use, user_context)
+    if cached:
+        return cached
+    user_message_parts.append(f"WEBPAGE CONTENT: {page_excerpt}")
+
+    user_message = "\n".join(user_message_parts)
+
     payload = {
         "model": model_to_use,
         "messages": [
-            {"role": "system", "content": system_prompt},
+            ANALYSIS_SYSTEM_MESSAGE,
             {"role": "user", "content": user_message},
         ],
-        "max_tokens": 800,  # Increased for richer analysis
+        "max_tokens": config.ANALYSIS_MAX_TOKENS,
         "temperature": 0.3,  # Slightly lower for more consistent extraction
         "response_format": {"type": "json_object"},
     }
 
-    loop = asyncio.get_running_loop()
     try:
-        response = await loop.run_in_executor(
-            None,
-            lambda: client.chat.completions.create(**payload),
-        )
+        response = await async_client.chat.completions.create(**payload)
         if not response or not getattr(response, "choices", None):
             logger.warning("AI analysis returned no choices for supplied content.")
             return DEFAULT_ANALYSIS.copy()
@@ -108,15 +121,17 @@ async def analyze_text_content(text_content: str, *, model: Optional[str] = None
             logger.warning("AI analysis returned an empty message payload.")
             return DEFAULT_ANALYSIS.copy()
 
-        parsed = json.loads(ai_payload) if ai_payload else {}
+        parsed = orjson.loads(ai_payload) if ai_payload else {}
     except Exception as exc:  # noqa: broad-except - downstream consumers need a graceful fallback
         logger.warning("AI analysis error: %s", exc)
-        if not model and model_to_use != "gpt-4o-mini":
+        if not model and model_to_use != FALLBACK_MODEL:
             # Retry once with a lightweight default model before giving up.
-            return await analyze_text_content(text_content, model="gpt-4o-mini")
+            return await analyze_text_content(text_content, model=FALLBACK_MODEL)
         return DEFAULT_ANALYSIS.copy()
 
-    return _normalise_ai_output(parsed)
+    analysis = _normalise_ai_output(parsed)
+    await link_cache.set_analysis(page_excerpt, model_to_use, user_context, analysis)
+    return analysis
 
 
 async def generate_embedding(text_content: str, *, model: Optional[str] = None) -> Optional[Dict[str, Any]]:
@@ -128,26 +143,153 @@ async def generate_embedding(text_content: str, *, model: Optional[str] = None)
         return None
 
     model_to_use = model or DEFAULT_EMBEDDING_MODEL
-    payload = {
-        "model": model_to_use,
-        "input": text_content,
-    }
+    excerpt = truncate_to_tokens(text_content, config.EMBEDDING_INPUT_TOKENS, model_to_use)
+    cached = await link_cache.get_embedding(excerpt, model_to_use)
+    if cached:
+        return {"vector": cached, "model": model_to_use}
 
-    loop = asyncio.get_running_loop()
     try:
-        response = await loop.run_in_executor(
-            None,
-            lambda: client.embeddings.create(**payload),
-        )
-        vector = response.data[0].embedding if response and response.data else None
+        vector = await _get_embedding_batcher(model_to_use).embed(excerpt)
         if not vector:
             return None
+        await link_cache.set_embedding(excerpt, model_to_use, vector)
         return {"vector": vector, "model": model_to_use}
     except Exception as exc:  # noqa: broad-except -- we surface failure but keep pipeline alive.
         logger.warning("Embedding generation error: %s", exc)
         return None
 
 
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent embedding requests into one `embeddings.create` call.
+
+    Callers await `embed(text)`; requests arriving within `window` seconds of each other
+    (up to `max_batch` inputs) share a single API round-trip and get their vectors back
+    by index.
+    """
+
+    def __init__(self, model: str, *, max_batch: int = 64, window: float = 0.03):
+        self.model = model
+        self.max_batch = max_batch
+        self.window = window
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # The loop only keeps weak references to tasks; hold in-flight sends until done.
+        self._sends: Set["asyncio.Task[None]"] = set()
+
+    async def embed(self, text: str) -> Optional[List[float]]:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # A new event loop (e.g. a restarted application) can't use the old timer.
+            self._loop = loop
+            self._pending = []
+            self._flush_handle = None
+            self._sends = set()
+
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = self._loop.create_task(self._send(batch))
+            self._sends.add(task)
+            task.add_done_callback(self._sends.discard)
+
+    async def _send(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        inputs = [text for text, _ in batch]
+        try:
+            response = await async_client.embeddings.create(model=self.model, input=inputs)
+            vectors: List[Optional[List[float]]] = [None] * len(batch)
+            for item in (response.data if response else None) or []:
+                vectors[item.index] = item.embedding
+        except Exception as exc:  # noqa: broad-except -- each waiting caller decides how to degrade.
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+
+_EMBEDDING_BATCHERS: Dict[str, EmbeddingBatcher] = {}
+
+
+def _get_embedding_batcher(model: str) -> EmbeddingBatcher:
+    batcher = _EMBEDDING_BATCHERS.get(model)
+    if batcher is None:
+        batcher = _EMBEDDING_BATCHERS[model] = EmbeddingBatcher(model)
+    return batcher
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str) -> str:
+    """
+    Trims text so it fits within `max_tokens` for the given model.
+    Uses tiktoken when available and falls back to a character budget otherwise.
+    """
+    if not text or max_tokens <= 0:
+        return ""
+
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return text[: max_tokens * CHARS_PER_TOKEN]
+
+    # Bound the encoding work for very long pages; no token spans this many characters.
+    candidate = text[: max_tokens * CHARS_PER_TOKEN * 4]
+    tokens = encoding.encode(candidate, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return candidate
+    return encoding.decode(tokens[:max_tokens])
+
+
+# Loaded tokenizers by model. Failures are not stored, only throttled: a transient download
+# error is retried once ENCODING_RETRY_SECONDS have passed instead of lasting until restart.
+ENCODING_RETRY_SECONDS = 300
+_ENCODINGS: Dict[str, Any] = {}
+_ENCODING_RETRY_AT: Dict[str, float] = {}
+
+
+def _get_encoding(model: str):
+    """Returns a cached tokenizer for the model, or None when tiktoken is unusable."""
+    if tiktoken is None:
+        return None
+    encoding = _ENCODINGS.get(model)
+    if encoding is not None or time.monotonic() < _ENCODING_RETRY_AT.get(model, 0.0):
+        return encoding
+    try:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception as exc:  # noqa: broad-except -- encodings are fetched lazily and may be unreachable.
+        logger.warning("Tokenizer unavailable for %s, using character budget: %s", model, exc)
+        _ENCODING_RETRY_AT[model] = time.monotonic() + ENCODING_RETRY_SECONDS
+        return None
+    _ENCODINGS[model] = encoding
+    return encoding
+
+
+def warm_tokenizers() -> None:
+    """
+    Loads the tokenizers for the configured models. tiktoken downloads the BPE file on
+    first use, so this blocks; main_bot runs it in a worker thread at startup so the
+    download never happens inside a chat's analysis on the event loop.
+    """
+    for model in {DEFAULT_MODEL, FALLBACK_MODEL, DEFAULT_EMBEDDING_MODEL}:
+        _get_encoding(model)
+
+
 def _normalise_ai_output(raw: Dict[str, Any]) -> Dict[str, Any]:
     """Normalises the OpenAI response into the structure expected by downstream consumers."""
     if not isinstance(raw, dict):
@@ -171,16 +313,19 @@ def _normalise_ai_output(raw: Dict[str, Any]) -> Dict[str, Any]:
                 continue
             entities.append({"name": name, "type": entity_type})
 
+    # Single ordered pass: the primary category first, then topics, duplicates dropped.
     categories: List[str] = []
-    if category:
-        categories.append(str(category))
-    categories.extend(topic for topic in topics if topic)
+    seen = set()
+    for candidate in (str(category) if category else None, *topics):
+        if candidate and candidate not in seen:
+            seen.add(candidate)
+            categories.append(candidate)
 
     summary = raw.get("summary") or DEFAULT_ANALYSIS["summary"]
 
     return {
         "category": category,
-        "categories": list(dict.fromkeys(categories)),  # preserve order, remove duplicates
+        "categories": categories,
         "topics": topics,
         "entities": entities,
         "summary": summary,
@@ -194,7 +339,8 @@ def _ensure_list_of_strings(value: Any) -> List[str]:
     if isinstance(value, str):
         return [value]
     if isinstance(value, list):
-        return [str(item) for item in value if item]
+        # Model output is almost always strings already; only coerce the odd number or dict.
+        return [item if isinstance(item, str) else str(item) for item in value if item]
     return []
 
 
@@ -202,6 +348,6 @@ if __name__ == "__main__":
     async def _demo():
         url = "https://openai.com/research/gpt-4"
         enriched = await process_link(url)
-        print(json.dumps(enriched, indent=2, default=str))
+        print(orjson.dumps(enriched, option=orjson.OPT_INDENT_2, default=str).decode())
 
     asyncio.run(_demo())
@@ -2,11 +2,14 @@
 link_processor.py - Utilities for fetching, parsing, and enriching link content.
 """
 
-import base64
+import binascii
+import codecs
+import copy
+import functools
 import logging
 import math
-import mimetypes
 import re
+import threading
 from pathlib import Path
 from typing import Dict, Optional
 from urllib.parse import urljoin, urlparse
@@ -14,14 +17,29 @@ from uuid import uuid4
 
 import requests
 from bs4 import BeautifulSoup
-
-from config import Config
+from cachetools import TLRUCache
+from requests.adapters import HTTPAdapter
+from requests.compat import chardet
+from urllib3.util.retry import Retry
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:  # The C-backed lxml parser is much faster; html.parser keeps us working without it.
+    etree = None
+    lxml_html = None
+    HTML_PARSER = "html.parser"
+else:
+    HTML_PARSER = "lxml"
+
+from config import get_config
+from link_cache import normalize_url
 from rendering_client import render_with_browser
 from vision import extract_text_from_image
 
 logger = logging.getLogger(__name__)
 
-config = Config()
+config = get_config()
 DEFAULT_HEADERS = {
     "User-Agent": (
         "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
@@ -32,8 +50,61 @@ DEFAULT_HEADERS = {
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
     "Accept-Charset": "utf-8, iso-8859-1;q=0.5",
 }
-SCREENSHOT_DIR = Path(config.SCREENSHOT_DIR)
-SCREENSHOT_DIR.mkdir(parents=True, exist_ok=True)
+WHITESPACE_PATTERN = re.compile(r"\s+")
+# Matches both <meta charset="x"> and <meta http-equiv="Content-Type" content="...; charset=x">.
+META_CHARSET_PATTERN = re.compile(rb"<meta[^>]+charset=[\"']?([A-Za-z0-9_\-:.]+)", re.IGNORECASE)
+CHARSET_SNIFF_BYTES = 4096
+
+BOILERPLATE_TAGS = ("script", "style", "noscript", "header", "footer", "nav")
+DESCRIPTION_META = ("og:description", "description")
+AUTHOR_META = ("author", "article:author", "og:author", "twitter:creator")
+PUBLISH_DATE_META = ("article:published_time", "og:published_time", "publication_date", "date")
+
+if etree is not None:
+    # Compiled once. Every metadata tag is gathered in a single document-order walk;
+    # the lang lookup is an absolute path and never walks the tree.
+    _HEAD_TAGS_XPATH = etree.XPath("//title | //meta[@content] | //link[@href]")
+    _HTML_LANG_XPATH = etree.XPath("string(/html/@lang)")
+
+# One pooled session keeps TCP/TLS connections alive across fetches (process_url runs in
+# worker threads; urllib3's pool is thread-safe for plain GETs).
+_SESSION = requests.Session()
+_SESSION.headers.update(DEFAULT_HEADERS)
+_ADAPTER = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=64,
+    max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504)),
+)
+_SESSION.mount("http://", _ADAPTER)
+_SESSION.mount("https://", _ADAPTER)
+
+# Re-shared links skip the fetch/parse/render pipeline for an hour, or for a few minutes
+# when the renderer was needed but did not report a clean render. The cache is bounded
+# by the characters it holds (renderer HTML has no size cap); process_url runs in worker
+# threads, so it is lock-guarded and hands out deep copies.
+PAGE_CACHE_TTL = 3600
+PAGE_CACHE_DEGRADED_TTL = 300
+RENDER_OK_STATUSES = frozenset({"ok", "rendered"})
+
+
+def _page_cache_ttu(_key: str, page: Dict[str, Optional[str]], now: float) -> float:
+    # render_status is None when the renderer was not needed, "unavailable" when it failed.
+    if page["render_status"] is not None and page["render_status"] not in RENDER_OK_STATUSES:
+        return now + PAGE_CACHE_DEGRADED_TTL
+    return now + PAGE_CACHE_TTL
+
+
+def _page_cache_size(page: Dict[str, Optional[str]]) -> int:
+    return len(page.get("html") or "") + len(page.get("text_content") or "") + 1024
+
+
+_PAGE_CACHE: TLRUCache = TLRUCache(
+    maxsize=config.PAGE_CACHE_MAX_CHARS, ttu=_page_cache_ttu, getsizeof=_page_cache_size
+)
+_PAGE_CACHE_LOCK = threading.Lock()
+
+SCREENSHOT_DIR = Path(config.SCREENSHOT_DIR)  # Created once by Config at startup.
+SCREENSHOT_EXTENSIONS = {"image/png": ".png", "image/jpeg": ".jpg", "image/webp": ".webp"}
 
 
 def fetch_page_content(url: str, *, timeout: int = 12) -> Optional[Dict[str, str]]:
@@ -44,90 +115,138 @@ def fetch_page_content(url: str, *, timeout: int = 12) -> Optional[Dict[str, str
         dict with keys: html, content_type, final_url
     """
     try:
-        response = requests.get(
-            url,
-            headers=DEFAULT_HEADERS,
-            timeout=timeout,
-            allow_redirects=True,
-        )
-        response.raise_for_status()
+        # Stream so non-text bodies are never downloaded and huge pages are capped.
+        with _SESSION.get(url, timeout=timeout, allow_redirects=True, stream=True) as response:
+            response.raise_for_status()
+            content_type = response.headers.get("Content-Type", "")
+            final_url = response.url
+            encoding = response.encoding
+            body = b""
+            if "html" in content_type or "text" in content_type:
+                body = response.raw.read(config.MAX_HTML_BYTES, decode_content=True) or b""
     except requests.RequestException as exc:
         logger.warning("Error fetching URL %s: %s", url, exc)
         return None
 
-    content_type = response.headers.get("Content-Type", "")
     html = ""
-    
-    if "html" in content_type or "text" in content_type:
+    if body:
         # Improve encoding detection for international content (especially Hebrew)
-        if response.encoding is None or response.encoding.lower() in ['iso-8859-1', 'ascii']:
-            # If no encoding detected or default ISO encoding, try to detect from content
-            from bs4 import BeautifulSoup
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Look for meta charset declaration
-            charset_meta = soup.find('meta', attrs={'charset': True})
-            if charset_meta and charset_meta.get('charset'):
-                response.encoding = charset_meta['charset']
-            else:
-                # Look for http-equiv content-type
-                content_type_meta = soup.find('meta', attrs={'http-equiv': re.compile(r'content-type', re.I)})
-                if content_type_meta and content_type_meta.get('content'):
-                    content = content_type_meta['content']
-                    charset_match = re.search(r'charset=([^;\s]+)', content, re.I)
-                    if charset_match:
-                        response.encoding = charset_match.group(1)
-                    else:
-                        # Default to UTF-8 for better international support
-                        response.encoding = 'utf-8'
-                else:
-                    # Default to UTF-8 for better international support  
-                    response.encoding = 'utf-8'
-        
+        if encoding is None or encoding.lower() in ['iso-8859-1', 'ascii']:
+            encoding = _sniff_charset(body)
         try:
-            html = response.text
-        except UnicodeDecodeError:
-            # Fallback: try UTF-8 decoding directly
-            try:
-                html = response.content.decode('utf-8', errors='replace')
-                logger.info("Used UTF-8 fallback decoding for %s", url)
-            except Exception as decode_exc:
-                logger.warning("Failed to decode content for %s: %s", url, decode_exc)
-                html = response.content.decode('utf-8', errors='ignore')
+            html = body.decode(encoding or 'utf-8', errors='replace')
+        except LookupError:
+            # Unknown charset label: fall back to UTF-8 decoding directly
+            html = body.decode('utf-8', errors='replace')
+            logger.info("Used UTF-8 fallback decoding for %s", url)
 
     return {
         "html": html,
         "content_type": content_type,
-        "final_url": response.url,
+        "final_url": final_url,
     }
 
 
+def _sniff_charset(body: bytes) -> str:
+    """
+    Finds the document charset from its <meta charset> / http-equiv declaration, which
+    the HTML spec requires within the first 1024 bytes; we scan 4 KiB to be lenient.
+    Undeclared documents are assumed to be UTF-8 unless they fail to decode as such.
+    """
+    match = META_CHARSET_PATTERN.search(body, 0, CHARSET_SNIFF_BYTES)
+    if match:
+        return match.group(1).decode("ascii", "ignore")
+    try:
+        # final=False tolerates a multi-byte character cut off by the MAX_HTML_BYTES cap.
+        codecs.getincrementaldecoder("utf-8")().decode(body, final=False)
+    except UnicodeDecodeError:
+        # Same detector requests uses for Response.apparent_encoding.
+        detected = chardet.detect(body) if chardet is not None else None
+        if detected and detected.get("encoding"):
+            return detected["encoding"]
+    return "utf-8"
+
+
 def extract_text_content(html_content: str) -> str:
     """Converts HTML into a cleaned plain-text representation."""
     if not html_content:
         return ""
 
-    soup = BeautifulSoup(html_content, "html.parser")
-    for element in soup(["script", "style", "noscript", "header", "footer", "nav"]):
+    tree = _parse_tree(html_content)
+    if tree is not None:
+        return extract_text_from_tree(tree)
+    return extract_text_from_soup(BeautifulSoup(html_content, HTML_PARSER))
+
+
+def _parse_tree(html_content: str):
+    """Parses HTML with lxml directly; returns None when lxml is unavailable or rejects the input."""
+    if lxml_html is None:
+        return None
+    try:
+        return lxml_html.document_fromstring(html_content)
+    except ValueError:
+        # lxml refuses str input that carries an XML encoding declaration; hand it bytes instead.
+        try:
+            return lxml_html.document_fromstring(html_content.encode("utf-8"))
+        except (etree.ParserError, ValueError):
+            return None
+    except etree.ParserError:
+        return None
+
+
+def extract_text_from_tree(tree) -> str:
+    """
+    Converts an lxml document into cleaned plain text.
+
+    Boilerplate elements and comments are stripped in place (their tail text is kept).
+    """
+    etree.strip_elements(tree, etree.Comment, *BOILERPLATE_TAGS, with_tail=False)
+    text = " ".join(fragment.strip() for fragment in tree.itertext() if fragment.strip())
+    return WHITESPACE_PATTERN.sub(" ", text).strip()
+
+
+def extract_text_from_soup(soup: BeautifulSoup) -> str:
+    """
+    Converts an already-parsed page into cleaned plain text.
+
+    Boilerplate elements are decomposed in place, so read anything else you need
+    from the tree first.
+    """
+    for element in soup(list(BOILERPLATE_TAGS)):
         element.decompose()
 
     text = soup.get_text(separator=" ", strip=True)
     # Collapse extraneous whitespace so downstream NLP has cleaner input.
-    text = re.sub(r"\s+", " ", text)
+    text = WHITESPACE_PATTERN.sub(" ", text)
     return text.strip()
 
 
-def _find_meta_content(soup: BeautifulSoup, names) -> Optional[str]:
-    """Finds the first meta tag matching any of the provided names/properties."""
+def _collect_meta_content(soup: BeautifulSoup) -> Dict[str, str]:
+    """Maps each meta name/property to its first non-empty content in one sweep of the tree."""
+    contents: Dict[str, str] = {}
+    for tag in soup.find_all("meta", attrs={"content": True}):
+        content = tag["content"].strip()
+        if not content:
+            continue
+        for key in (tag.get("name"), tag.get("property")):
+            if key:
+                contents.setdefault(key, content)
+    return contents
+
+
+def _find_meta_content(meta: Dict[str, str], names) -> Optional[str]:
+    """Returns the content of the first of ``names`` present in the collected meta tags."""
     for name in names:
-        tag = soup.find("meta", attrs={"name": name}) or soup.find(
-            "meta", attrs={"property": name}
-        )
-        if tag and tag.get("content"):
-            return tag["content"].strip()
+        if name in meta:
+            return meta[name]
     return None
 
 
+@functools.lru_cache(maxsize=1024)
+def _domain_of(url: str) -> str:
+    return urlparse(url).netloc.lower()
+
+
 def _absolute_url(href: Optional[str], base_url: Optional[str]) -> Optional[str]:
     if not href:
         return None
@@ -148,43 +267,119 @@ def extract_metadata(
     if not html_content:
         return {}
 
-    soup = BeautifulSoup(html_content, "html.parser")
-
-    title = soup.title.string.strip() if soup.title and soup.title.string else ""
-    description = _find_meta_content(soup, ["og:description", "description"]) or ""
-    author = _find_meta_content(
-        soup,
-        [
-            "author",
-            "article:author",
-            "og:author",
-            "twitter:creator",
-        ],
+    tree = _parse_tree(html_content)
+    if tree is not None:
+        return extract_metadata_from_tree(tree, url=url, content_type=content_type)
+    return extract_metadata_from_soup(
+        BeautifulSoup(html_content, HTML_PARSER),
+        url=url,
+        content_type=content_type,
     )
-    publish_date = _find_meta_content(
-        soup,
-        [
-            "article:published_time",
-            "og:published_time",
-            "publication_date",
-            "date",
-        ],
+
+
+def extract_metadata_from_tree(
+    tree,
+    *,
+    url: Optional[str] = None,
+    content_type: Optional[str] = None,
+) -> Dict[str, Optional[str]]:
+    """
+    lxml counterpart of extract_metadata_from_soup: title, meta and link tags are
+    collected in one sweep with the compiled _HEAD_TAGS_XPATH.
+
+    The text pass runs last because it strips boilerplate elements from ``tree``.
+    """
+    title: Optional[str] = None
+    meta: Dict[str, str] = {}
+    favicon_href: Optional[str] = None
+    canonical_href: Optional[str] = None
+    for element in _HEAD_TAGS_XPATH(tree):
+        tag = element.tag
+        if tag == "meta":
+            content = element.get("content").strip()
+            if content:
+                for key in (element.get("name"), element.get("property")):
+                    if key:
+                        meta.setdefault(key, content)
+        elif tag == "link":
+            rel = element.get("rel") or ""
+            if favicon_href is None and "icon" in rel.lower():
+                favicon_href = element.get("href")
+            if canonical_href is None and rel == "canonical":
+                canonical_href = element.get("href")
+        elif title is None:
+            title = element.text_content()
+
+    return _build_metadata(
+        title=(title or "").strip(),
+        description=_find_meta_content(meta, DESCRIPTION_META),
+        author=_find_meta_content(meta, AUTHOR_META),
+        publish_date=_find_meta_content(meta, PUBLISH_DATE_META),
+        favicon_href=favicon_href,
+        canonical_href=canonical_href or None,
+        language=_HTML_LANG_XPATH(tree) or None,
+        text_content=extract_text_from_tree(tree),
+        url=url,
+        content_type=content_type,
     )
-    favicon_tag = soup.find("link", rel=lambda value: value and "icon" in value.lower())
-    favicon = _absolute_url(favicon_tag["href"], url) if favicon_tag else None
 
-    canonical_tag = soup.find("link", rel="canonical")
-    canonical_href = canonical_tag["href"] if canonical_tag and canonical_tag.get("href") else None
-    canonical_url = _absolute_url(canonical_href, url)
 
+def extract_metadata_from_soup(
+    soup: BeautifulSoup,
+    *,
+    url: Optional[str] = None,
+    content_type: Optional[str] = None,
+) -> Dict[str, Optional[str]]:
+    """
+    Extracts metadata and the cleaned text from a parsed page, sharing one tree.
+
+    The text pass runs last because it strips boilerplate elements from ``soup``.
+    """
+    title = soup.title.string.strip() if soup.title and soup.title.string else ""
+    favicon_tag = soup.find("link", rel=lambda value: value and "icon" in value.lower())
+    canonical_tag = soup.find("link", rel="canonical")
     html_tag = soup.find("html")
-    language = html_tag.get("lang") if html_tag and html_tag.get("lang") else None
+    meta = _collect_meta_content(soup)
+    return _build_metadata(
+        title=title,
+        description=_find_meta_content(meta, DESCRIPTION_META),
+        author=_find_meta_content(meta, AUTHOR_META),
+        publish_date=_find_meta_content(meta, PUBLISH_DATE_META),
+        favicon_href=favicon_tag.get("href") if favicon_tag else None,
+        canonical_href=canonical_tag.get("href") if canonical_tag else None,
+        language=html_tag.get("lang") if html_tag else None,
+        text_content=extract_text_from_soup(soup),
+        url=url,
+        content_type=content_type,
+    )
+
+
+def _count_words(text: str) -> int:
+    """Counts words in whitespace-collapsed text without building a token list."""
+    return text.count(" ") + 1 if text else 0
+
+
+def _build_metadata(
+    *,
+    title: str,
+    description: Optional[str],
+    author: Optional[str],
+    publish_date: Optional[str],
+    favicon_href: Optional[str],
+    canonical_href: Optional[str],
+    language: Optional[str],
+    text_content: str,
+    url: Optional[str],
+    content_type: Optional[str],
+) -> Dict[str, Optional[str]]:
+    """Assembles the metadata dict shared by the lxml and BeautifulSoup extractors."""
+    favicon = _absolute_url(favicon_href, url)
+    canonical_url = _absolute_url(canonical_href, url)
 
-    text_content = extract_text_content(html_content)
-    word_count = len(text_content.split())
+    word_count = _count_words(text_content)
     read_time = math.ceil(word_count / 200) if word_count else None
 
-    domain = urlparse(url or "").netloc.lower() if url else None
+    domain = _domain_of(url) if url else None
 
     metadata = {
         "title": title or None,
@@ -204,31 +399,55 @@ def extract_metadata(
     return metadata
 
 
+@functools.lru_cache(maxsize=512)
+def _canonicalize_url(url: str) -> str:
+    """Cache key for process_url: the normalised URL without tracking parameters."""
+    return normalize_url(url)
+
+
 def process_url(url: str) -> Optional[Dict[str, Optional[str]]]:
     """
     Convenience helper that fetches and parses all useful information for a link.
     Falls back to a headless browser render (and optionally OCR) when the direct fetch
-    does not expose enough readable text.
+    does not expose enough readable text. Results with readable text are cached per URL
+    (see PAGE_CACHE_TTL).
     """
+    key = _canonicalize_url(url)
+    with _PAGE_CACHE_LOCK:
+        cached = _PAGE_CACHE.get(key)
+    # A screenshot cleaned up since the page was cached makes the entry unusable.
+    if cached is not None and (not cached["screenshot_path"] or Path(cached["screenshot_path"]).exists()):
+        return copy.deepcopy(cached)
+
+    result = _process_url_uncached(url)
+    if result is not None and result["text_content"]:
+        with _PAGE_CACHE_LOCK:
+            try:
+                _PAGE_CACHE[key] = copy.deepcopy(result)
+            except ValueError:  # A single page bigger than the whole cache is not kept.
+                pass
+    return result
+
+
+def _process_url_uncached(url: str) -> Optional[Dict[str, Optional[str]]]:
     page = fetch_page_content(url)
     if not page:
         return None
 
     final_url = page.get("final_url", url)
-    metadata = extract_metadata(
-        page["html"],
-        url=final_url,
-        content_type=page.get("content_type"),
-    )
+    metadata = extract_metadata(page["html"], url=final_url, content_type=page.get("content_type"))
 
     text_content = metadata.pop("text_content", "") or ""
+    word_count = metadata.get("word_count") or 0
     extraction_method = "direct"
     render_status: Optional[str] = None
     screenshot_path: Optional[str] = None
 
-    if _should_retry_with_renderer(text_content, metadata):
+    if _should_retry_with_renderer(word_count, metadata):
         render_result = render_with_browser(final_url)
-        if render_result:
+        if not render_result:
+            render_status = "unavailable"
+        else:
             extraction_method = "renderer"
             render_status = render_result.status
             final_url = render_result.resolved_url or final_url
@@ -241,9 +460,11 @@ def process_url(url: str) -> Optional[Dict[str, Optional[str]]]:
                     content_type=page.get("content_type"),
                 )
                 text_content = metadata.pop("text_content", "") or ""
+                word_count = metadata.get("word_count") or 0
 
             if not text_content and render_result.text_content:
                 text_content = render_result.text_content.strip()
+                word_count = len(text_content.split())
 
             if render_result.screenshot_base64:
                 screenshot_path = _persist_screenshot(
@@ -251,16 +472,16 @@ def process_url(url: str) -> Optional[Dict[str, Optional[str]]]:
                     render_result.screenshot_mime or "image/png",
                 )
 
-                needs_ocr = not text_content or len(text_content.split()) < config.RENDERER_MIN_WORDS
-                if needs_ocr:
+                if word_count < config.RENDERER_MIN_WORDS:
                     ocr_text = extract_text_from_image(
                         render_result.screenshot_base64,
                         mime_type=render_result.screenshot_mime or "image/png",
                     )
                     if ocr_text:
                         text_content = ocr_text.strip()
+                        word_count = len(text_content.split())
 
-    _update_metadata_counts(metadata, text_content)
+    _update_metadata_counts(metadata, word_count)
 
     return {
         "html": page["html"],
@@ -273,15 +494,14 @@ def process_url(url: str) -> Optional[Dict[str, Optional[str]]]:
     }
 
 
-def _should_retry_with_renderer(text_content: str, metadata: Dict[str, Optional[str]]) -> bool:
+def _should_retry_with_renderer(word_count: int, metadata: Dict[str, Optional[str]]) -> bool:
     """Determines whether the renderer should be invoked for minimal pages."""
     if not config.ENABLE_RENDERER or not config.RENDERER_URL:
         return False
 
-    if not text_content:
+    if not word_count:
         return True
 
-    word_count = len(text_content.split())
     if word_count >= config.RENDERER_MIN_WORDS:
         return False
 
@@ -299,12 +519,13 @@ def _persist_screenshot(image_base64: str, mime_type: str) -> Optional[str]:
         return None
 
     try:
-        image_bytes = base64.b64decode(image_base64)
-    except (ValueError, TypeError) as exc:
+        # a2b_base64 takes the ASCII str as-is; b64decode would first copy it to bytes.
+        image_bytes = binascii.a2b_base64(image_base64)
+    except (ValueError, TypeError) as exc:  # binascii.Error is a ValueError
         logger.warning("Failed to decode screenshot from renderer: %s", exc)
         return None
 
-    extension = mimetypes.guess_extension(mime_type) or ".png"
+    extension = SCREENSHOT_EXTENSIONS.get(mime_type, ".png")
     filename = f"rendered_{uuid4().hex}{extension}"
     path = SCREENSHOT_DIR / filename
 
@@ -316,9 +537,8 @@ def _persist_screenshot(image_base64: str, mime_type: str) -> Optional[str]:
         return None
 
 
-def _update_metadata_counts(metadata: Dict[str, Optional[str]], text_content: str) -> None:
-    """Recalculates word count and read time based on the final text content."""
-    word_count = len(text_content.split())
+def _update_metadata_counts(metadata: Dict[str, Optional[str]], word_count: int) -> None:
+    """Stores the word count and read time of the final text content."""
     read_time = math.ceil(word_count / 200) if word_count else None
     metadata["word_count"] = word_count
     metadata["read_time"] = read_time
@@ -2,13 +2,14 @@
 link_retriever.py - Natural language search for links.
 """
 
+import heapq
 import re
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set
 
 import database
 
-STOP_WORDS = {
+STOP_WORDS = frozenset({
     "the",
     "and",
     "about",
@@ -30,9 +31,9 @@ STOP_WORDS = {
     "to",
     "on",
     "in",
-}
+})
 
-TEMPORAL_TOKENS = {
+TEMPORAL_TOKENS = frozenset({
     "today",
     "yesterday",
     "tonight",
@@ -42,7 +43,31 @@ TEMPORAL_TOKENS = {
     "recent",
     "latest",
     "last",
-}
+})
+
+# Tokens dropped from search phrases, checked with a single set lookup per token.
+IGNORED_TOKENS = STOP_WORDS | TEMPORAL_TOKENS
+
+# Fixed relative windows, checked in order against the lowercased query.
+TIME_WINDOW_PHRASES = (
+    ("last week", timedelta(days=7)),
+    ("last month", timedelta(days=30)),
+    ("last year", timedelta(days=365)),
+)
+
+# "Show me what's new" shortcut keywords, matched against whole query tokens.
+RECENT_KEYWORDS = frozenset({"recent", "latest"})
+TOKEN_PATTERN = re.compile(r"[A-Za-z0-9']+")
+ENTITY_PATTERN = re.compile(
+    r"(?:from|by|with|shared by)\s+([A-Za-z0-9][A-Za-z0-9_\-]*)",
+    re.IGNORECASE,
+)
+LAST_DAYS_PATTERN = re.compile(r"last (\d+) days")
+LAST_WEEKS_PATTERN = re.compile(r"last (\d+) weeks")
+# Word-boundary matches so possessives like "today's" still count; TOKEN_PATTERN
+# keeps the apostrophe, so a token lookup would miss them.
+TODAY_PATTERN = re.compile(r"\btoday\b")
+YESTERDAY_PATTERN = re.compile(r"\byesterday\b")
 
 
 def find_links_by_query(user_id: int, query: str, limit: int = 5) -> List[Dict[str, Any]]:
@@ -54,102 +79,81 @@ def find_links_by_query(user_id: int, query: str, limit: int = 5) -> List[Dict[s
         return []
 
     query_lower = query.lower()
+    # Lowercase and tokenize once; every helper below works from these tokens.
+    query_tokens = TOKEN_PATTERN.findall(query_lower)
 
     # Handle recent/latest queries
-    if any(token in query_lower for token in ("recent", "latest")):
+    if not RECENT_KEYWORDS.isdisjoint(query_tokens):
         return database.get_recent_links(user_id, limit=limit)
 
     # Extract time filters and entities
     window_start = _extract_time_filter(query_lower)
     entities = _extract_entities(query)
     
-    # Enhanced search strategy: try multiple approaches
-    search_results = []
-    
-    # 1. First try: search with original query (captures user context and rich descriptions)
-    results1 = database.search_links(user_id, query, limit=limit * 2)
-    search_results.extend(results1)
-    
-    # 2. Second try: search with cleaned terms + entities
-    cleaned_terms = _clean_query_terms(query)
+    # Enhanced search strategy: try multiple phrasings, all resolved in one database round trip.
+    # 1. The original query (captures user context and rich descriptions)
+    phrases = [(query, limit * 2)]
+
+    # 2. Cleaned terms + entities
+    cleaned_terms = _clean_query_terms(query_tokens)
     if cleaned_terms and cleaned_terms != query:
         search_terms = cleaned_terms
         if entities:
             search_terms = f"{search_terms} {' '.join(entities)}".strip()
-        
-        results2 = database.search_links(user_id, search_terms, limit=limit * 2)
-        # Add unique results not already found
-        existing_urls = {r.get('url') for r in search_results}
-        search_results.extend([r for r in results2 if r.get('url') not in existing_urls])
-    
-    # 3. Third try: search by individual meaningful words (for partial matches)
-    meaningful_words = _extract_meaningful_words(query)
+        phrases.append((search_terms, limit * 2))
+
+    # 3. Individual meaningful words (for partial matches)
+    meaningful_words = _extract_meaningful_words(query_tokens)
     if meaningful_words and len(meaningful_words) >= 2:
         for word in meaningful_words[:3]:  # Try top 3 meaningful words
             if len(word) >= 4:  # Only search for substantial words
-                word_results = database.search_links(user_id, word, limit=5)
-                existing_urls = {r.get('url') for r in search_results}
-                search_results.extend([r for r in word_results if r.get('url') not in existing_urls])
-    
-    # Apply time filtering if specified
-    if window_start:
-        search_results = [
-            link
-            for link in search_results
-            if link.get("created_at") and link["created_at"] >= window_start
-        ]
-    
+                phrases.append((word, 5))
+
+    # Results come back de-duplicated, grouped in phrase order, and already limited to
+    # the time window (the database applies it before each phrase's LIMIT).
+    search_results = database.multi_search_links(user_id, phrases, since=window_start)
+
     # Score and rank results by relevance
-    scored_results = _score_search_results(search_results, query, entities)
-    
-    return scored_results[:limit]
+    return _score_search_results(search_results, query_lower, set(query_tokens), entities, limit)
 
 
-def _clean_query_terms(query: str) -> str:
-    tokens = re.findall(r"[A-Za-z0-9']+", query.lower())
+def _clean_query_terms(tokens: List[str]) -> str:
     filtered = [
         token
         for token in tokens
-        if token not in STOP_WORDS and token not in TEMPORAL_TOKENS
+        if token not in IGNORED_TOKENS
     ]
     return " ".join(filtered)
 
 
 def _extract_entities(query: str) -> List[str]:
-    matches = re.findall(
-        r"(?:from|by|with|shared by)\s+([A-Za-z0-9][A-Za-z0-9_\-]*)",
-        query,
-        flags=re.IGNORECASE,
-    )
+    matches = ENTITY_PATTERN.findall(query)
     # Keep original casing for better search hits.
     return matches
 
 
 def _extract_time_filter(query_lower: str) -> Optional[datetime]:
-    now = datetime.now(timezone.utc)
-
-    if "today" in query_lower:
-        return datetime(now.year, now.month, now.day, tzinfo=timezone.utc)
+    # Round relative windows down to the minute so repeated searches share one
+    # database.multi_search_links cache entry instead of a new key per call.
+    now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
 
-    if "yesterday" in query_lower:
-        midnight_today = datetime(now.year, now.month, now.day, tzinfo=timezone.utc)
-        return midnight_today - timedelta(days=1)
+    if TODAY_PATTERN.search(query_lower):
+        return midnight
 
-    if "last week" in query_lower:
-        return now - timedelta(days=7)
+    if YESTERDAY_PATTERN.search(query_lower):
+        return midnight - timedelta(days=1)
 
-    if "last month" in query_lower:
-        return now - timedelta(days=30)
+    for phrase, window in TIME_WINDOW_PHRASES:
+        if phrase in query_lower:
+            return now - window
 
-    if "last year" in query_lower:
-        return now - timedelta(days=365)
-
-    match_days = re.search(r"last (\d+) days", query_lower)
+    match_days = LAST_DAYS_PATTERN.search(query_lower)
     if match_days:
         days = int(match_days.group(1))
         return now - timedelta(days=days)
 
-    match_weeks = re.search(r"last (\d+) weeks", query_lower)
+    match_weeks = LAST_WEEKS_PATTERN.search(query_lower)
     if match_weeks:
         weeks = int(match_weeks.group(1))
         return now - timedelta(weeks=weeks)
@@ -157,15 +161,12 @@ def _extract_time_filter(query_lower: str) -> Optional[datetime]:
     return None
 
 
-def _extract_meaningful_words(query: str) -> List[str]:
-    """Extract meaningful words from query, ranked by potential search value."""
-    tokens = re.findall(r"[A-Za-z0-9']+", query.lower())
-    
+def _extract_meaningful_words(tokens: List[str]) -> List[str]:
+    """Extract meaningful words from the query tokens, ranked by potential search value."""
     # Filter out stop words and temporal tokens
     meaningful = [
         token for token in tokens
-        if token not in STOP_WORDS 
-        and token not in TEMPORAL_TOKENS
+        if token not in IGNORED_TOKENS
         and len(token) >= 3  # Only substantial words
     ]
     
@@ -175,13 +176,18 @@ def _extract_meaningful_words(query: str) -> List[str]:
     return meaningful
 
 
-def _score_search_results(results: List[Dict[str, Any]], query: str, entities: List[str]) -> List[Dict[str, Any]]:
-    """Score and rank search results by relevance to query."""
+def _score_search_results(
+    results: List[Dict[str, Any]],
+    query_lower: str,
+    query_words: Set[str],
+    entities: List[str],
+    limit: int,
+) -> List[Dict[str, Any]]:
+    """Score the search results against the (lowercased) query and return the ``limit`` best."""
     if not results:
         return []
-    
-    query_lower = query.lower()
-    query_words = set(re.findall(r"[A-Za-z0-9']+", query_lower))
+
+    entity_lowers = [entity.lower() for entity in entities]
     
     scored_results = []
     for result in results:
@@ -190,28 +196,26 @@ def _score_search_results(results: List[Dict[str, Any]], query: str, entities: L
         # Check title matches
         title = (result.get("title") or "").lower()
         if title:
-            title_words = set(re.findall(r"[A-Za-z0-9']+", title))
+            title_words = set(TOKEN_PATTERN.findall(title))
             score += len(query_words.intersection(title_words)) * 3
         
         # Check summary/description matches  
         summary = (result.get("ai_summary") or result.get("description") or "").lower()
         if summary:
-            summary_words = set(re.findall(r"[A-Za-z0-9']+", summary))
+            summary_words = set(TOKEN_PATTERN.findall(summary))
             score += len(query_words.intersection(summary_words)) * 2
         
         # Check category matches
         categories = result.get("categories") or []
         category_text = " ".join(categories).lower()
         if category_text:
-            category_words = set(re.findall(r"[A-Za-z0-9']+", category_text))
+            category_words = set(TOKEN_PATTERN.findall(category_text))
             score += len(query_words.intersection(category_words)) * 2
         
         # Bonus for entity matches
-        if entities:
-            for entity in entities:
-                entity_lower = entity.lower()
-                if entity_lower in title or entity_lower in summary:
-                    score += 5
+        for entity_lower in entity_lowers:
+            if entity_lower in title or entity_lower in summary:
+                score += 5
         
         # Exact phrase matches get highest score
         if query_lower in title or query_lower in summary:
@@ -219,6 +223,6 @@ def _score_search_results(results: List[Dict[str, Any]], query: str, entities: L
         
         scored_results.append((score, result))
     
-    # Sort by score (descending) and return results
-    scored_results.sort(key=lambda x: -x[0])
-    return [result for score, result in scored_results]
+    # Keep only the top ``limit``; ties stay in database order, as a stable sort would.
+    top = heapq.nlargest(limit, scored_results, key=lambda x: x[0])
+    return [result for score, result in top]
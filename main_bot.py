@@ -2,10 +2,17 @@
 main_bot.py - Main entry point for the Silo Telegram Bot
 """
 
+import asyncio
 import logging
-from telegram.ext import Application, CommandHandler, MessageHandler, filters
-from config import Config
+from telegram import BotCommand, Update
+from telegram.ext import AIORateLimiter, Application, CommandHandler, MessageHandler, filters
+from config import get_config
 import database
+import link_archiver
+import link_cache
+import link_intelligence
+import openai_client
+import rendering_client
 from handlers import (
     start_command,
     help_command,
@@ -14,7 +21,8 @@ from handlers import (
     stats_command,
     export_command,
     archive_command,
-    handle_message
+    handle_message,
+    stop_chat_workers,
 )
 
 # Set up logging
@@ -24,11 +32,52 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Shown in Telegram's command menu; mirrors the commands listed in /help.
+BOT_COMMANDS = (
+    BotCommand("recent", "Show your latest saved links"),
+    BotCommand("search", "Search your saved links"),
+    BotCommand("stats", "Quick stats about your knowledge base"),
+    BotCommand("export", "Download a CSV of your links"),
+    BotCommand("archive", "Capture a snapshot of a page"),
+    BotCommand("help", "Show the help menu"),
+)
+
+async def _post_init(application: Application) -> None:
+    """Publish the command menu and load tokenizers before polling starts."""
+    await application.bot.set_my_commands(BOT_COMMANDS)
+    await asyncio.to_thread(link_intelligence.warm_tokenizers)
+
+async def _post_stop(application: Application) -> None:
+    """Finish or cancel queued link work while the bot can still send its replies."""
+    await stop_chat_workers()
+
+async def _post_shutdown(application: Application) -> None:
+    """Release shared network clients once polling has stopped."""
+    await link_archiver.close()
+    await link_cache.close()
+    await openai_client.close()
+    rendering_client.close()
+
 def main():
     """Run the Silo bot."""
     # Create the Application and pass it your bot's token.
-    config = Config()
-    application = Application.builder().token(config.TELEGRAM_TOKEN).build()
+    config = get_config()
+    application = (
+        Application.builder()
+        .token(config.TELEGRAM_TOKEN)
+        # Handle updates from different chats in parallel; per-chat ordering of link
+        # ingestion is kept by the chat queues in handlers. Each in-flight reply needs a
+        # pooled connection to the Bot API.
+        .concurrent_updates(256)
+        .connection_pool_size(256)
+        # Queue outbound Bot API calls under Telegram's flood limits (bot-wide and per group)
+        # and retry RetryAfter responses instead of failing the handler.
+        .rate_limiter(AIORateLimiter(overall_max_rate=28, max_retries=2))
+        .post_init(_post_init)
+        .post_stop(_post_stop)
+        .post_shutdown(_post_shutdown)
+        .build()
+    )
 
     # Register command handlers
     application.add_handler(CommandHandler("start", start_command))
@@ -44,7 +93,8 @@ def main():
 
     # Run the bot until the user presses Ctrl-C
     logger.info("Starting Silo bot...")
-    application.run_polling()
+    # Only text messages and commands are handled; don't have Telegram deliver anything else.
+    application.run_polling(allowed_updates=[Update.MESSAGE])
 
 if __name__ == '__main__':
     # Create database tables if they don't exist
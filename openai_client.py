@@ -0,0 +1,42 @@
+"""
+openai_client.py - Shared OpenAI clients used for analysis, embeddings, and vision OCR.
+
+Keeping one client per calling style means every OpenAI call reuses the same pool of
+keep-alive connections instead of paying a fresh TCP/TLS handshake per module. Analysis
+and embeddings run on the event loop through ``async_client``; vision OCR runs inside
+the blocking page pipeline and keeps the synchronous ``client``.
+"""
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+try:  # HTTP/2 needs the optional h2 package (httpx[http2]).
+    import h2  # noqa: F401
+except ImportError:  # pragma: no cover - optional dependency
+    _HTTP2_AVAILABLE = False
+else:
+    _HTTP2_AVAILABLE = True
+
+from config import get_config
+
+config = get_config()
+
+# Fail fast on connect and on waiting for a pooled connection; only reads wait for the model.
+_TIMEOUT = httpx.Timeout(connect=5.0, read=config.OPENAI_TIMEOUT, write=30.0, pool=5.0)
+_LIMITS = httpx.Limits(
+    max_connections=config.OPENAI_MAX_CONNECTIONS,
+    max_keepalive_connections=max(1, config.OPENAI_MAX_CONNECTIONS // 2),
+)
+
+http_client = httpx.Client(limits=_LIMITS, timeout=_TIMEOUT, http2=_HTTP2_AVAILABLE)
+client = OpenAI(api_key=config.OPENAI_API_KEY, http_client=http_client)
+
+async_http_client = httpx.AsyncClient(limits=_LIMITS, timeout=_TIMEOUT, http2=_HTTP2_AVAILABLE)
+async_client = AsyncOpenAI(api_key=config.OPENAI_API_KEY, http_client=async_http_client)
+
+
+async def close() -> None:
+    """Closes both clients' connection pools (called on bot shutdown)."""
+    await async_client.close()
+    # Blocking, but it only tears down pooled sockets.
+    client.close()
@@ -15,15 +15,41 @@ Response (JSON):
 }
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 import logging
-from typing import Optional
-import requests
+import threading
+from typing import Dict, Optional
 
-from config import Config
+import httpx
+import orjson
+from cachetools import TTLCache
+
+try:  # HTTP/2 needs the optional h2 package (httpx[http2]).
+    import h2  # noqa: F401
+except ImportError:  # pragma: no cover - optional dependency
+    _HTTP2_AVAILABLE = False
+else:
+    _HTTP2_AVAILABLE = True
+
+from config import get_config
+from link_cache import normalize_url
 
 logger = logging.getLogger(__name__)
-config = Config()
+
+# Renders run inside the blocking page pipeline (worker threads), so one thread-safe sync
+# client keeps connections to the renderer alive instead of handshaking on every page.
+# Config and the client are resolved on first render, so importing this module needs
+# neither environment variables nor sockets.
+_client: Optional[httpx.Client] = None
+_CLIENT_LOCK = threading.Lock()
+
+# Popular links are rendered once per window; concurrent renders of the same URL wait for
+# the first one (single-flight). Large screenshots are dropped from cached entries.
+RENDER_CACHE_TTL = 600
+MAX_CACHED_SCREENSHOT_CHARS = 1024 * 1024
+_RENDER_CACHE: TTLCache = TTLCache(maxsize=2048, ttl=RENDER_CACHE_TTL)
+_RENDER_LOCK = threading.Lock()
+_IN_FLIGHT: Dict[str, threading.Event] = {}
 
 
 @dataclass
@@ -36,35 +62,82 @@ class RenderResult:
     status: Optional[str] = None
 
 
+def _get_client() -> httpx.Client:
+    """Returns the shared renderer client, creating it on first use."""
+    global _client
+    with _CLIENT_LOCK:
+        if _client is None:
+            _client = httpx.Client(
+                http2=_HTTP2_AVAILABLE,
+                timeout=get_config().RENDERER_TIMEOUT,
+                limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+            )
+        return _client
+
+
 def render_with_browser(url: str) -> Optional[RenderResult]:
     """
     Calls the configured renderer service to obtain a fully rendered DOM (with JS executed).
     Returns a RenderResult on success or None when rendering should be considered unavailable.
+    Successful renders are cached per normalised URL for RENDER_CACHE_TTL seconds.
     """
+    config = get_config()
     if not config.ENABLE_RENDERER or not config.RENDERER_URL:
         logger.debug("Renderer disabled or not configured; skipping render for %s", url)
         return None
 
-    payload = {"url": url}
-    headers = {"Accept": "application/json"}
+    key = normalize_url(url)
+    with _RENDER_LOCK:
+        cached = _RENDER_CACHE.get(key)
+        if cached is not None:
+            return cached
+        pending = _IN_FLIGHT.get(key)
+        if pending is None:
+            _IN_FLIGHT[key] = threading.Event()
+
+    if pending is not None:
+        # Another thread is rendering this URL; share its outcome (None if it failed).
+        pending.wait(config.RENDERER_TIMEOUT)
+        with _RENDER_LOCK:
+            return _RENDER_CACHE.get(key)
+
+    result = None
+    try:
+        result = _render_uncached(url)
+    finally:
+        with _RENDER_LOCK:
+            if result is not None:
+                _RENDER_CACHE[key] = _cacheable(result)
+            _IN_FLIGHT.pop(key).set()
+    return result
+
+
+def _cacheable(result: RenderResult) -> RenderResult:
+    """Drops oversized screenshots so cached renders stay small."""
+    if result.screenshot_base64 and len(result.screenshot_base64) > MAX_CACHED_SCREENSHOT_CHARS:
+        return replace(result, screenshot_base64=None, screenshot_mime=None)
+    return result
+
+
+def _render_uncached(url: str) -> Optional[RenderResult]:
+    """Performs the renderer HTTP call and parses its JSON response."""
+    config = get_config()
+    payload = orjson.dumps({"url": url})
+    headers = {"Accept": "application/json", "Content-Type": "application/json"}
     if config.RENDERER_API_KEY:
         headers["Authorization"] = f"Bearer {config.RENDERER_API_KEY}"
 
     try:
-        response = requests.post(
-            config.RENDERER_URL,
-            json=payload,
-            headers=headers,
-            timeout=config.RENDERER_TIMEOUT,
-        )
+        response = _get_client().post(config.RENDERER_URL, content=payload, headers=headers)
         response.raise_for_status()
-    except requests.RequestException as exc:
+    except httpx.HTTPError as exc:
         logger.warning("Renderer request failed for %s: %s", url, exc)
         return None
 
     try:
-        data = response.json()
-    except ValueError:
+        # Rendered pages can carry megabytes of HTML and base64 screenshot; parse the bytes directly.
+        data = orjson.loads(response.content)
+    except orjson.JSONDecodeError:
         logger.warning("Renderer returned non-JSON payload for %s", url)
         return None
 
@@ -87,3 +160,12 @@ def render_with_browser(url: str) -> Optional[RenderResult]:
         screenshot_mime=screenshot_mime,
         status=status,
     )
+
+
+def close() -> None:
+    """Closes the renderer connection pool (called on bot shutdown)."""
+    global _client
+    with _CLIENT_LOCK:
+        if _client is not None:
+            _client.close()
+            _client = None
@@ -0,0 +1,148 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import database
+
+
+@pytest.fixture(autouse=True)
+def clear_read_caches():
+    """Keep cached reads from leaking between tests."""
+    for cache in (
+        database._RECENT_LINKS_CACHE,
+        database._LINK_STATS_CACHE,
+        database._SEARCH_CACHE,
+        database._LINK_OWNERS,
+        database._LAST_WRITTEN,
+        database._CACHE_GENERATIONS,
+    ):
+        cache.clear()
+
+
+def test_recent_links_are_cached_until_the_user_writes(monkeypatch):
+    calls = []
+
+    def fake_fetch(user_id, limit):
+        calls.append((user_id, limit))
+        return [{"link_id": 1, "title": "First"}]
+
+    monkeypatch.setattr(database, "_fetch_recent_links", fake_fetch)
+
+    first = database.get_recent_links(42, limit=5)
+    second = database.get_recent_links(42, limit=5)
+
+    assert calls == [(42, 5)]
+    assert first is second
+    with pytest.raises(TypeError):
+        first[0]["title"] = "Mutated"
+
+    database._invalidate(user_id=42, link_id=1)
+    database.get_recent_links(42, limit=5)
+
+    assert calls == [(42, 5), (42, 5)]
+
+
+def test_searches_are_cached_until_the_user_writes(monkeypatch):
+    calls = []
+
+    def fake_fetch(user_id, phrases, since):
+        calls.append((user_id, phrases))
+        return [{"link_id": 1, "title": "Docs"}]
+
+    monkeypatch.setattr(database, "_fetch_multi_search_links", fake_fetch)
+
+    first = database.multi_search_links(42, [("docs", 10)])
+    second = database.multi_search_links(42, [("docs", 10)])
+    database.multi_search_links(99, [("docs", 10)])
+
+    assert calls == [(42, (("docs", 10),)), (99, (("docs", 10),))]
+    assert first is second
+
+    database._invalidate(user_id=42, link_id=1)
+    database.multi_search_links(42, [("docs", 10)])
+
+    assert len(calls) == 3
+    assert (99, (("docs", 10),), None) in database._SEARCH_CACHE
+
+
+def test_reads_that_race_a_write_are_not_cached(monkeypatch):
+    def fetch_during_write(user_id):
+        database._invalidate(user_id=user_id, link_id=1)
+        return {"total_links": 0}
+
+    monkeypatch.setattr(database, "_fetch_link_stats", fetch_during_write)
+    database.get_link_stats(42)
+
+    assert 42 not in database._LINK_STATS_CACHE
+
+
+def test_connection_checkout_waits_for_a_free_slot(monkeypatch):
+    class FakePool:
+        def getconn(self):
+            return SimpleNamespace(closed=0)
+
+        def putconn(self, conn, close=False):
+            pass
+
+    monkeypatch.setattr(database, "_get_pool", lambda: FakePool())
+    monkeypatch.setattr(database, "_POOL_SLOTS", threading.BoundedSemaphore(1))
+    checked_out = threading.Event()
+
+    def second_checkout():
+        with database._connection():
+            checked_out.set()
+
+    with database._connection():
+        worker = threading.Thread(target=second_checkout)
+        worker.start()
+        assert not checked_out.wait(0.1)
+
+    worker.join(1)
+    assert checked_out.is_set()
+
+
+def test_link_only_invalidation_evicts_the_owning_user(monkeypatch):
+    monkeypatch.setattr(database, "_fetch_link_stats", lambda user_id: {"total_links": user_id})
+    database._remember_owner(7, 42)
+
+    database.get_link_stats(42)
+    database.get_link_stats(99)
+    database._invalidate(link_id=7)
+
+    assert 42 not in database._LINK_STATS_CACHE
+    assert 99 in database._LINK_STATS_CACHE
+
+
+def test_save_link_bundle_skips_annotations_it_already_wrote(monkeypatch):
+    executed = []
+
+    class FakeCursor:
+        connection = None
+
+        def execute(self, query, params=None):
+            executed.append(query if isinstance(query, str) else query.decode())
+
+        def mogrify(self, query, params=None):
+            return query.encode()
+
+        def fetchone(self):
+            return (5,)
+
+    class FakeCursorContext:
+        def __enter__(self):
+            return FakeCursor()
+
+        def __exit__(self, *exc):
+            return False
+
+    monkeypatch.setattr(database, "_cursor", lambda **kwargs: FakeCursorContext())
+    bundle = {"metadata": {"author": "Ada"}, "categories": ["python"], "embedding": [0.1, 0.2]}
+
+    database.save_link_bundle(42, "https://example.com", **bundle)
+    database.save_link_bundle(42, "https://example.com", **bundle)
+    first, second = executed[1], executed[3]
+
+    assert "upsert_link_metadata" in first and "link_embeddings" in first
+    assert "upsert_link_metadata" not in second and "link_categories" not in second
+    assert "link_embeddings" not in second and "link_sources" in second
@@ -1,3 +1,4 @@
+import asyncio
 from html import unescape
 from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock
@@ -30,15 +31,7 @@ class FakeUpdate:
 @pytest.mark.asyncio
 async def test_handle_urls_persists_data_and_replies(monkeypatch):
     # Stub database functions to track calls without touching Postgres.
-    db_calls = {
-        "add_link": [],
-        "update_link_details": [],
-        "add_link_metadata": [],
-        "add_link_categories": [],
-        "add_link_entities": [],
-        "record_link_source": [],
-        "store_link_embedding": [],
-    }
+    bundle_calls = []
 
     monkeypatch.setattr(
         handlers.database,
@@ -47,38 +40,8 @@ async def test_handle_urls_persists_data_and_replies(monkeypatch):
     )
     monkeypatch.setattr(
         handlers.database,
-        "add_link",
-        lambda *args, **kwargs: db_calls["add_link"].append((args, kwargs)) or 101,
-    )
-    monkeypatch.setattr(
-        handlers.database,
-        "update_link_details",
-        lambda *args, **kwargs: db_calls["update_link_details"].append((args, kwargs)),
-    )
-    monkeypatch.setattr(
-        handlers.database,
-        "add_link_metadata",
-        lambda *args, **kwargs: db_calls["add_link_metadata"].append((args, kwargs)),
-    )
-    monkeypatch.setattr(
-        handlers.database,
-        "add_link_categories",
-        lambda *args, **kwargs: db_calls["add_link_categories"].append((args, kwargs)),
-    )
-    monkeypatch.setattr(
-        handlers.database,
-        "add_link_entities",
-        lambda *args, **kwargs: db_calls["add_link_entities"].append((args, kwargs)),
-    )
-    monkeypatch.setattr(
-        handlers.database,
-        "record_link_source",
-        lambda *args, **kwargs: db_calls["record_link_source"].append((args, kwargs)),
-    )
-    monkeypatch.setattr(
-        handlers.database,
-        "store_link_embedding",
-        lambda *args, **kwargs: db_calls["store_link_embedding"].append((args, kwargs)),
+        "save_link_bundle",
+        lambda *args, **kwargs: bundle_calls.append((args, kwargs)) or 101,
     )
 
     fake_page = {
@@ -88,7 +51,7 @@ async def test_handle_urls_persists_data_and_replies(monkeypatch):
             "description": "Example description",
             "domain": "example.com",
         },
-        "text_content": "This is example content.",
+        "text_content": "This is example content about the article. " * 10,
         "html": "<html></html>",
     }
 
@@ -115,14 +78,16 @@ async def test_handle_urls_persists_data_and_replies(monkeypatch):
 
     await handlers.handle_urls(update, user_id=42, urls=["https://example.com/article"])
 
-    # Database calls were recorded
-    assert db_calls["add_link"]
-    assert db_calls["update_link_details"]
-    assert db_calls["add_link_metadata"]
-    assert db_calls["add_link_categories"]
-    assert db_calls["add_link_entities"]
-    assert db_calls["record_link_source"]
-    assert db_calls["store_link_embedding"]
+    # Everything was written in a single bundle.
+    assert len(bundle_calls) == 1
+    args, kwargs = bundle_calls[0]
+    assert args == (42, "https://example.com/article")
+    assert kwargs["ai_summary"] == "AI summary."
+    assert kwargs["metadata"]["title"] == "Example Title"
+    assert kwargs["categories"] == ["article", "ai"]
+    assert kwargs["entities"] == [{"name": "Example Corp", "type": "company"}]
+    assert kwargs["embedding"] == [0.1, 0.2, 0.3]
+    assert kwargs["embedding_model"] == "test-emb"
 
     # User gets a formatted response with the title and summary.
     sent = update.message.sent_messages[0]
@@ -134,51 +99,13 @@ async def test_handle_urls_persists_data_and_replies(monkeypatch):
 
 @pytest.mark.asyncio
 async def test_handle_urls_handles_pages_without_text(monkeypatch):
-    db_calls = {
-        "add_link": [],
-        "update_link_details": [],
-        "add_link_metadata": [],
-        "add_link_categories": [],
-        "add_link_entities": [],
-        "record_link_source": [],
-        "store_link_embedding": [],
-    }
+    bundle_calls = []
 
     monkeypatch.setattr(handlers.database, "add_user", lambda user_id, username: None)
     monkeypatch.setattr(
         handlers.database,
-        "add_link",
-        lambda *args, **kwargs: db_calls["add_link"].append((args, kwargs)) or 303,
-    )
-    monkeypatch.setattr(
-        handlers.database,
-        "update_link_details",
-        lambda *args, **kwargs: db_calls["update_link_details"].append((args, kwargs)),
-    )
-    monkeypatch.setattr(
-        handlers.database,
-        "add_link_metadata",
-        lambda *args, **kwargs: db_calls["add_link_metadata"].append((args, kwargs)),
-    )
-    monkeypatch.setattr(
-        handlers.database,
-        "add_link_categories",
-        lambda *args, **kwargs: db_calls["add_link_categories"].append((args, kwargs)),
-    )
-    monkeypatch.setattr(
-        handlers.database,
-        "add_link_entities",
-        lambda *args, **kwargs: db_calls["add_link_entities"].append((args, kwargs)),
-    )
-    monkeypatch.setattr(
-        handlers.database,
-        "record_link_source",
-        lambda *args, **kwargs: db_calls["record_link_source"].append((args, kwargs)),
-    )
-    monkeypatch.setattr(
-        handlers.database,
-        "store_link_embedding",
-        lambda *args, **kwargs: db_calls["store_link_embedding"].append((args, kwargs)),
+        "save_link_bundle",
+        lambda *args, **kwargs: bundle_calls.append((args, kwargs)) or 303,
     )
 
     monkeypatch.setattr(
@@ -203,11 +130,131 @@ async def test_handle_urls_handles_pages_without_text(monkeypatch):
 
     await handlers.handle_urls(update, user_id=7, urls=["https://example.com/secure"])
 
-    assert not db_calls["add_link_categories"]
-    assert not db_calls["add_link_entities"]
-    assert not db_calls["store_link_embedding"]
+    _, kwargs = bundle_calls[0]
+    assert not kwargs["categories"]
+    assert not kwargs["entities"]
+    assert kwargs["embedding"] is None
 
     sent = update.message.sent_messages[0]
     rendered_text = unescape(sent["text"])
     assert "Private Invoice" in rendered_text
-    assert "I couldn't read the page contents" in rendered_text
+    assert "I couldn't read the page content" in rendered_text
+
+
+@pytest.mark.asyncio
+async def test_handle_urls_does_not_claim_short_pages_were_analysed(monkeypatch):
+    monkeypatch.setattr(handlers.database, "add_user", lambda user_id, username: None)
+    monkeypatch.setattr(handlers.database, "save_link_bundle", lambda *args, **kwargs: 404)
+    monkeypatch.setattr(
+        handlers,
+        "process_url",
+        lambda url: {
+            "resolved_url": url,
+            "metadata": {"title": "Tiny Page", "description": None, "domain": "example.com"},
+            "text_content": "Only a few words here.",
+            "html": "<html></html>",
+        },
+    )
+    analyze = AsyncMock()
+    monkeypatch.setattr(handlers, "analyze_text_content", analyze)
+    monkeypatch.setattr(handlers, "generate_embedding", AsyncMock(return_value=None))
+
+    update = SimpleNamespace(message=FakeMessage())
+    update.message.text = "https://example.com/tiny"
+
+    await handlers.handle_urls(update, user_id=7, urls=["https://example.com/tiny"])
+
+    rendered_text = unescape(update.message.sent_messages[0]["text"])
+    analyze.assert_not_awaited()
+    assert "saved it without AI tags" in rendered_text
+    assert "couldn't read the page content" not in rendered_text
+    assert "words processed" not in rendered_text
+
+
+def test_message_chunks_keep_blocks_whole_under_the_limit():
+    blocks = ["<b>header</b>", "a" * 30, "b" * 30, "word " * 20]
+
+    chunks = list(handlers._iter_message_chunks(blocks, limit=50))
+
+    assert all(len(chunk) <= 50 for chunk in chunks)
+    assert chunks[0] == "<b>header</b>\n\n" + "a" * 30
+    assert chunks[1] == "b" * 30
+    assert " ".join(chunks[2:]).split() == ["word"] * 20
+
+
+def test_message_chunks_never_split_tags_or_entities():
+    block = '<a href="https://example.com">' + "Long title " * 10 + "</a>\n" + "tom &amp; jerry " * 10
+
+    for limit in (40, 120, 200):
+        chunks = list(handlers._iter_message_chunks([block], limit=limit))
+
+        assert all(len(chunk) <= limit for chunk in chunks)
+        for chunk in chunks:
+            assert chunk.count("<a ") == chunk.count("</a>")
+            assert handlers.HTML_TOKEN_PATTERN.sub("", chunk).count("&") == 0
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_concurrent_identical_work():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return ["result"]
+
+    first, second = await asyncio.gather(
+        handlers._single_flight(("search", 1, "docs", 5), work),
+        handlers._single_flight(("search", 1, "docs", 5), work),
+    )
+
+    assert calls == [1]
+    assert first is second
+    assert not handlers._IN_FLIGHT
+
+
+@pytest.mark.asyncio
+async def test_single_flight_waiters_retry_when_the_owner_is_cancelled():
+    started = asyncio.Event()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        started.set()
+        await asyncio.sleep(0 if len(calls) > 1 else 10)
+        return ["result"]
+
+    owner = asyncio.create_task(handlers._single_flight("page", work))
+    await started.wait()
+    waiter = asyncio.create_task(handlers._single_flight("page", work))
+    await asyncio.sleep(0)
+    owner.cancel()
+
+    assert await waiter == ["result"]
+    assert owner.cancelled()
+    assert len(calls) == 2
+    assert not handlers._IN_FLIGHT
+
+
+@pytest.mark.asyncio
+async def test_stop_chat_workers_cancels_what_does_not_drain(monkeypatch):
+    release = asyncio.Event()
+    handled = []
+
+    async def slow_handle_urls(update, user_id, urls, user_note, placeholder=None):
+        handled.append(urls)
+        await release.wait()
+
+    monkeypatch.setattr(handlers, "handle_urls", slow_handle_urls)
+    monkeypatch.setattr(handlers, "CHAT_WORKER_DRAIN_SECONDS", 0.05)
+
+    update = SimpleNamespace(message=FakeMessage(), effective_chat=SimpleNamespace(id=555))
+    await handlers._enqueue_urls(update, 1, ["https://example.com/a"], "")
+    await handlers._enqueue_urls(update, 1, ["https://example.com/b"], "")
+    await asyncio.sleep(0)
+
+    await handlers.stop_chat_workers()
+
+    assert handled == [["https://example.com/a"]]
+    assert not handlers._CHAT_WORKERS
+    assert 555 not in handlers._CHAT_QUEUES
@@ -1,3 +1,4 @@
+import asyncio
 from types import SimpleNamespace
 
 import pytest
@@ -7,11 +8,11 @@ import link_intelligence
 
 @pytest.mark.asyncio
 async def test_analyze_text_content_handles_missing_choices(monkeypatch):
-    def fake_chat_completion(**kwargs):
+    async def fake_chat_completion(**kwargs):
         return SimpleNamespace(choices=None)
 
     monkeypatch.setattr(
-        link_intelligence.client.chat.completions,
+        link_intelligence.async_client.chat.completions,
         "create",
         fake_chat_completion,
     )
@@ -21,3 +22,60 @@ async def test_analyze_text_content_handles_missing_choices(monkeypatch):
     assert result["summary"] == "No summary available."
     assert result["categories"] == []
     assert result["entities"] == []
+
+
+def test_truncate_to_tokens_falls_back_to_character_budget(monkeypatch):
+    monkeypatch.setattr(link_intelligence, "_get_encoding", lambda model: None)
+
+    text = "word " * 100
+
+    truncated = link_intelligence.truncate_to_tokens(text, 10, "gpt-4o-mini")
+
+    assert truncated == text[: 10 * link_intelligence.CHARS_PER_TOKEN]
+
+
+def test_tokenizer_failures_are_retried_after_a_cooldown(monkeypatch):
+    attempts = []
+
+    def flaky_encoding_for_model(model):
+        attempts.append(model)
+        if len(attempts) == 1:
+            raise ConnectionError("download failed")
+        return "encoding"
+
+    monkeypatch.setattr(link_intelligence, "tiktoken", SimpleNamespace(encoding_for_model=flaky_encoding_for_model))
+    monkeypatch.setattr(link_intelligence, "_ENCODINGS", {})
+    monkeypatch.setattr(link_intelligence, "_ENCODING_RETRY_AT", {})
+
+    assert link_intelligence._get_encoding("m") is None
+    assert link_intelligence._get_encoding("m") is None  # Still cooling down.
+    link_intelligence._ENCODING_RETRY_AT["m"] = 0.0
+
+    assert link_intelligence._get_encoding("m") == "encoding"
+    assert attempts == ["m", "m"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_embeddings_share_one_request(monkeypatch):
+    requests = []
+
+    async def fake_embeddings_create(*, model, input):
+        requests.append(list(input))
+        return SimpleNamespace(
+            data=[
+                SimpleNamespace(index=index, embedding=[float(index)])
+                for index in range(len(input))
+            ]
+        )
+
+    monkeypatch.setattr(link_intelligence.async_client.embeddings, "create", fake_embeddings_create)
+    monkeypatch.setattr(link_intelligence, "_EMBEDDING_BATCHERS", {})
+
+    first, second = await asyncio.gather(
+        link_intelligence.generate_embedding("first page"),
+        link_intelligence.generate_embedding("second page"),
+    )
+
+    assert len(requests) == 1
+    assert first["vector"] == [0.0]
+    assert second["vector"] == [1.0]
@@ -3,6 +3,8 @@ import math
 from pathlib import Path
 from types import SimpleNamespace
 
+import pytest
+
 import link_processor
 from link_processor import extract_metadata, extract_text_content
 
@@ -32,6 +34,13 @@ SAMPLE_HTML = """
 """
 
 
+@pytest.fixture(autouse=True)
+def clear_page_cache():
+    link_processor._PAGE_CACHE.clear()
+    yield
+    link_processor._PAGE_CACHE.clear()
+
+
 def test_extract_metadata_prioritises_opengraph_description():
     metadata = extract_metadata(
         SAMPLE_HTML,
@@ -84,8 +93,7 @@ def test_process_url_uses_renderer_for_sparse_pages(monkeypatch, tmp_path):
     monkeypatch.setattr(link_processor.config, "ENABLE_RENDERER", True, raising=False)
     monkeypatch.setattr(link_processor.config, "RENDERER_URL", "https://renderer.local", raising=False)
     monkeypatch.setattr(link_processor.config, "RENDERER_MIN_WORDS", 50, raising=False)
-    monkeypatch.setattr(link_processor, "SCREENSHOT_DIR", tmp_path / "screenshots")
-    link_processor.SCREENSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    monkeypatch.setattr(link_processor, "SCREENSHOT_DIR", tmp_path)
 
     result = link_processor.process_url("https://example.com/paywall")
 
@@ -124,8 +132,7 @@ def test_process_url_uses_ocr_when_renderer_only_returns_screenshot(monkeypatch,
     monkeypatch.setattr(link_processor.config, "RENDERER_URL", "https://renderer.local", raising=False)
     monkeypatch.setattr(link_processor.config, "RENDERER_MIN_WORDS", 50, raising=False)
     monkeypatch.setattr(link_processor.config, "ENABLE_SCREENSHOT_OCR", True, raising=False)
-    monkeypatch.setattr(link_processor, "SCREENSHOT_DIR", tmp_path / "screenshots")
-    link_processor.SCREENSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    monkeypatch.setattr(link_processor, "SCREENSHOT_DIR", tmp_path)
 
     result = link_processor.process_url("https://example.com/image-only")
 
@@ -136,3 +143,44 @@ def test_process_url_uses_ocr_when_renderer_only_returns_screenshot(monkeypatch,
 
     # Clean up the saved screenshot after assertion.
     Path(result["screenshot_path"]).unlink()
+
+
+def test_process_url_reuses_cached_result_for_tracking_variants(monkeypatch):
+    fetches = []
+
+    def fake_fetch(url):
+        fetches.append(url)
+        return {"html": SAMPLE_HTML, "content_type": "text/html", "final_url": url}
+
+    monkeypatch.setattr(link_processor, "fetch_page_content", fake_fetch)
+    monkeypatch.setattr(link_processor.config, "ENABLE_RENDERER", False, raising=False)
+
+    first = link_processor.process_url("https://example.com/articles/sample?utm_source=x")
+    first["metadata"]["title"] = "mutated by caller"
+    second = link_processor.process_url("https://example.com/articles/sample")
+
+    assert len(fetches) == 1
+    assert second["metadata"]["title"] == "Example Article"
+
+
+def test_process_url_does_not_cache_degraded_results(monkeypatch):
+    fetches = []
+
+    def fake_fetch(url):
+        fetches.append(url)
+        return {"html": "<html><body></body></html>", "content_type": "text/html", "final_url": url}
+
+    monkeypatch.setattr(link_processor, "fetch_page_content", fake_fetch)
+    monkeypatch.setattr(link_processor, "render_with_browser", lambda url: None)
+    monkeypatch.setattr(link_processor.config, "ENABLE_RENDERER", True, raising=False)
+    monkeypatch.setattr(link_processor.config, "RENDERER_URL", "https://renderer.local", raising=False)
+
+    # No readable text: never cached.
+    link_processor.process_url("https://example.com/empty")
+    link_processor.process_url("https://example.com/empty")
+    assert len(fetches) == 2
+
+    # Readable text but the renderer was down: cached only briefly.
+    page = {"render_status": "unavailable"}
+    assert link_processor._page_cache_ttu("key", page, 0) == link_processor.PAGE_CACHE_DEGRADED_TTL
+    assert link_processor._page_cache_ttu("key", {"render_status": None}, 0) == link_processor.PAGE_CACHE_TTL
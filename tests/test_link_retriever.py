@@ -14,7 +14,7 @@ def reset_database(monkeypatch):
         "database",
         SimpleNamespace(
             get_recent_links=lambda user_id, limit=5: [],
-            search_links=lambda user_id, query, limit=10: [],
+            multi_search_links=lambda user_id, phrases, since=None: [],
         ),
     )
 
@@ -31,7 +31,7 @@ def test_recent_keyword_shortcuts_to_recent_links(monkeypatch):
     assert results == expected
 
 
-def test_time_window_filters_results(monkeypatch):
+def test_time_window_is_pushed_to_the_search(monkeypatch):
     now = datetime.now(timezone.utc)
     older = now - timedelta(days=10)
     recent = now - timedelta(days=2)
@@ -40,31 +40,47 @@ def test_time_window_filters_results(monkeypatch):
         {"created_at": recent, "title": "Recent link"},
         {"created_at": older, "title": "Old link"},
     ]
+    windows = []
 
-    monkeypatch.setattr(
-        link_retriever.database,
-        "search_links",
-        lambda user_id, query, limit=10: sample_results,
-    )
+    def fake_multi_search(user_id, phrases, since=None):
+        windows.append(since)
+        return [link for link in sample_results if since is None or link["created_at"] >= since]
+
+    monkeypatch.setattr(link_retriever.database, "multi_search_links", fake_multi_search)
 
     results = link_retriever.find_links_by_query(1, "something last week", limit=5)
     assert len(results) == 1
     assert results[0]["title"] == "Recent link"
+    assert windows[0] is not None
+    assert abs(windows[0] - (now - timedelta(days=7))) < timedelta(minutes=1)
+    # Rounded to the minute so repeated searches hit the same cache key.
+    assert windows[0].second == 0 and windows[0].microsecond == 0
+
+
+def test_possessive_day_words_still_set_the_window(monkeypatch):
+    windows = []
+
+    def fake_multi_search(user_id, phrases, since=None):
+        windows.append(since)
+        return []
+
+    monkeypatch.setattr(link_retriever.database, "multi_search_links", fake_multi_search)
+
+    link_retriever.find_links_by_query(1, "yesterday's python article", limit=5)
+    midnight = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    assert windows[0] == midnight - timedelta(days=1)
 
 
-def test_fallback_to_raw_query_when_initial_cleaned_search_empty(monkeypatch):
+def test_raw_and_cleaned_queries_share_one_search(monkeypatch):
     calls = []
 
-    def fake_search(user_id, query, limit=10):
-        calls.append(query)
-        if query.strip() == "docs":
-            return []
+    def fake_multi_search(user_id, phrases, since=None):
+        calls.append(phrases)
         return [{"title": "Match"}]
 
-    monkeypatch.setattr(link_retriever.database, "search_links", fake_search)
+    monkeypatch.setattr(link_retriever.database, "multi_search_links", fake_multi_search)
 
     results = link_retriever.find_links_by_query(4, "show me docs", limit=5)
     assert results[0]["title"] == "Match"
-    # Two calls: first with cleaned terms, second with raw query.
-    assert calls[0] == "docs"
-    assert calls[1] == "show me docs"
+    # One round trip: the raw query first, then the cleaned terms.
+    assert calls == [[("show me docs", 10), ("docs", 10)]]
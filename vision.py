@@ -2,27 +2,34 @@
 vision.py - Utilities for extracting text from screenshots using OpenAI vision models.
 """
 
+import hashlib
 import logging
-from typing import Dict, List
+import threading
+from typing import Dict, List, Tuple
 
-from openai import OpenAI
+from cachetools import LRUCache
 
-from config import Config
+from config import get_config
+from openai_client import client
 
 logger = logging.getLogger(__name__)
 
-config = Config()
-client = OpenAI(api_key=config.OPENAI_API_KEY)
+config = get_config()
+
+# Identical screenshots (a paywall or login wall rendered for many URLs) are transcribed
+# once. OCR runs in worker threads, so the cache is lock-guarded; failures aren't cached.
+_OCR_CACHE: LRUCache = LRUCache(maxsize=512)
+_OCR_CACHE_LOCK = threading.Lock()
 
 
 def _collect_output_text(output: List[Dict]) -> str:
     """Extracts concatenated text from the responses API output structure."""
-    chunks: List[str] = []
-    for item in output or []:
-        for content in item.get("content", []):
-            if content.get("type") == "output_text" and content.get("text"):
-                chunks.append(content["text"])
-    return "\n".join(chunk.strip() for chunk in chunks if chunk).strip()
+    return "\n".join(
+        content["text"].strip()
+        for item in output or ()
+        for content in item.get("content", ())
+        if content.get("type") == "output_text" and content.get("text")
+    ).strip()
 
 
 def extract_text_from_image(image_base64: str, *, mime_type: str = "image/png") -> str:
@@ -33,6 +40,26 @@ def extract_text_from_image(image_base64: str, *, mime_type: str = "image/png")
     if not config.ENABLE_SCREENSHOT_OCR or not image_base64:
         return ""
 
+    key = _ocr_cache_key(image_base64, mime_type)
+    with _OCR_CACHE_LOCK:
+        cached = _OCR_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    text = _transcribe(image_base64, mime_type)
+    if text:
+        with _OCR_CACHE_LOCK:
+            _OCR_CACHE[key] = text
+    return text
+
+
+def _ocr_cache_key(image_base64: str, mime_type: str) -> Tuple[str, str, str]:
+    digest = hashlib.blake2b(image_base64.encode("ascii", "ignore"), digest_size=16).hexdigest()
+    return digest, mime_type, config.VISION_MODEL
+
+
+def _transcribe(image_base64: str, mime_type: str) -> str:
+    """Sends one screenshot to the vision model and returns the transcribed text."""
     try:
         response = client.responses.create(
             model=config.VISION_MODEL,